@@ -0,0 +1,43 @@
+"""add notification fanout jobs table
+
+Revision ID: a3f6b80d4c19
+Revises: f1c3d8a92e47
+Create Date: 2026-10-17 16:51:07.448260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6b80d4c19'
+down_revision: Union[str, None] = 'f1c3d8a92e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_fanout_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('post_id', sa.String(length=36), nullable=False),
+    sa.Column('author_id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('last_follower_id', sa.String(length=36), nullable=False),
+    sa.Column('delivered', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('post_id')
+    )
+    op.create_index('ix_notification_fanout_jobs_status_updated', 'notification_fanout_jobs', ['status', 'updated_at'], unique=False)
+    op.create_index('ix_notification_fanout_jobs_author_created', 'notification_fanout_jobs', ['author_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_fanout_jobs_author_created', table_name='notification_fanout_jobs')
+    op.drop_index('ix_notification_fanout_jobs_status_updated', table_name='notification_fanout_jobs')
+    op.drop_table('notification_fanout_jobs')
@@ -0,0 +1,42 @@
+"""add timeline_entries table
+
+Revision ID: a7c5d19e3f82
+Revises: f3b8e2a61c4d
+Create Date: 2026-10-17 12:26:04.913672
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c5d19e3f82'
+down_revision: Union[str, None] = 'f3b8e2a61c4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('fanout_on_read', sa.Boolean(), nullable=True, server_default='false'))
+
+    op.create_table('timeline_entries',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('post_id', sa.String(length=36), nullable=False),
+    sa.Column('author_id', sa.String(length=36), nullable=False),
+    sa.Column('published_at', sa.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    op.create_index('ix_timeline_entries_user_published', 'timeline_entries', ['user_id', 'published_at', 'post_id'], unique=False)
+    op.create_index('ix_timeline_entries_post_id', 'timeline_entries', ['post_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_timeline_entries_post_id', table_name='timeline_entries')
+    op.drop_index('ix_timeline_entries_user_published', table_name='timeline_entries')
+    op.drop_table('timeline_entries')
+    op.drop_column('users', 'fanout_on_read')
@@ -0,0 +1,26 @@
+"""add fanout job attempts
+
+Revision ID: a8d1f6c3e527
+Revises: e6f4b2c8a315
+Create Date: 2026-10-17 21:48:09.612754
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d1f6c3e527'
+down_revision: Union[str, None] = 'e6f4b2c8a315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notification_fanout_jobs', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('notification_fanout_jobs', 'attempts')
@@ -0,0 +1,30 @@
+"""add unique view sketches
+
+Revision ID: b2d94f6a0e17
+Revises: a7c5d19e3f82
+Create Date: 2026-10-17 14:41:52.087126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d94f6a0e17'
+down_revision: Union[str, None] = 'a7c5d19e3f82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('post_views', sa.Column('unique_sketch', sa.LargeBinary(), nullable=True))
+    op.add_column('post_views', sa.Column('unique_views', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('blog_posts', sa.Column('unique_views', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('blog_posts', 'unique_views')
+    op.drop_column('post_views', 'unique_views')
+    op.drop_column('post_views', 'unique_sketch')
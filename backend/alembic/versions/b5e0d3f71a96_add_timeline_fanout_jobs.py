@@ -0,0 +1,31 @@
+"""add timeline fanout jobs
+
+Revision ID: b5e0d3f71a96
+Revises: f8c1a6e3b207
+Create Date: 2026-10-17 20:02:16.370845
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e0d3f71a96'
+down_revision: Union[str, None] = 'f8c1a6e3b207'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notification_fanout_jobs', sa.Column('kind', sa.String(length=20), nullable=False, server_default='notification'))
+    op.drop_constraint('notification_fanout_jobs_post_id_key', 'notification_fanout_jobs', type_='unique')
+    op.create_index('ix_notification_fanout_jobs_post_kind', 'notification_fanout_jobs', ['post_id', 'kind'], unique=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM notification_fanout_jobs WHERE kind <> 'notification'")
+    op.drop_index('ix_notification_fanout_jobs_post_kind', table_name='notification_fanout_jobs')
+    op.create_unique_constraint('notification_fanout_jobs_post_id_key', 'notification_fanout_jobs', ['post_id'])
+    op.drop_column('notification_fanout_jobs', 'kind')
@@ -0,0 +1,72 @@
+"""add user stats table
+
+Revision ID: b6d2e91f7a05
+Revises: a3f6b80d4c19
+Create Date: 2026-10-17 17:19:36.815472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2e91f7a05'
+down_revision: Union[str, None] = 'a3f6b80d4c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('posts_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('views_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('unique_views_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('likes_received', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('comments_received', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('likes_given', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('followers_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('following_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    op.execute("""
+        INSERT INTO user_stats (
+            user_id, posts_count, views_count, unique_views_count, likes_received,
+            comments_received, likes_given, followers_count, following_count
+        )
+        SELECT
+            users.id,
+            COALESCE(posts.posts_count, 0),
+            COALESCE(posts.views_count, 0),
+            COALESCE(posts.unique_views_count, 0),
+            COALESCE(posts.likes_received, 0),
+            COALESCE(posts.comments_received, 0),
+            COALESCE(likes_given.count, 0),
+            COALESCE(followers.count, 0),
+            COALESCE(following.count, 0)
+        FROM users
+        LEFT JOIN (
+            SELECT user_id,
+                   COUNT(*) FILTER (WHERE status = 'published') AS posts_count,
+                   SUM(COALESCE(view_count, 0)) AS views_count,
+                   SUM(COALESCE(unique_views, 0)) AS unique_views_count,
+                   SUM(COALESCE(likes_count, 0)) AS likes_received,
+                   SUM(COALESCE(comments_count, 0)) AS comments_received
+            FROM blog_posts GROUP BY user_id
+        ) AS posts ON posts.user_id = users.id
+        LEFT JOIN (SELECT user_id, COUNT(*) AS count FROM post_likes GROUP BY user_id) AS likes_given
+            ON likes_given.user_id = users.id
+        LEFT JOIN (SELECT following_id, COUNT(*) AS count FROM follows GROUP BY following_id) AS followers
+            ON followers.following_id = users.id
+        LEFT JOIN (SELECT follower_id, COUNT(*) AS count FROM follows GROUP BY follower_id) AS following
+            ON following.follower_id = users.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
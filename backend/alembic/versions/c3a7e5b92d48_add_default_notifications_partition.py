@@ -0,0 +1,30 @@
+"""add default notifications partition
+
+Revision ID: c3a7e5b92d48
+Revises: b5e0d3f71a96
+Create Date: 2026-10-17 20:31:52.184027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a7e5b92d48'
+down_revision: Union[str, None] = 'b5e0d3f71a96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Catches rows for months without a partition instead of failing the insert;
+    # app.scripts.notification_retention moves them out when it creates the month
+    op.execute("CREATE TABLE notifications_default PARTITION OF notifications DEFAULT")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE notifications DETACH PARTITION notifications_default")
+    # Fails if a row has no monthly partition to go to, rather than losing it
+    op.execute("INSERT INTO notifications SELECT * FROM notifications_default")
+    op.execute("DROP TABLE notifications_default")
@@ -0,0 +1,43 @@
+"""add user daily stats table
+
+Revision ID: c4e8f2a7b913
+Revises: b6d2e91f7a05
+Create Date: 2026-10-17 17:44:02.318559
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8f2a7b913'
+down_revision: Union[str, None] = 'b6d2e91f7a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled by app.scripts.rollup_daily_stats; its first run backfills all history
+    op.create_table('user_daily_stats',
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('views', sa.Integer(), nullable=False),
+    sa.Column('unique_views', sa.Integer(), nullable=False),
+    sa.Column('likes', sa.Integer(), nullable=False),
+    sa.Column('comments', sa.Integer(), nullable=False),
+    sa.Column('follows', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+    # Range scans for the incremental rollup
+    op.create_index('ix_post_likes_created_at', 'post_likes', ['created_at'], unique=False)
+    op.create_index('ix_follows_created_at', 'follows', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_follows_created_at', table_name='follows')
+    op.drop_index('ix_post_likes_created_at', table_name='post_likes')
+    op.drop_table('user_daily_stats')
@@ -0,0 +1,29 @@
+"""add comment thread indexes
+
+Revision ID: c8e1f47a2d35
+Revises: b2d94f6a0e17
+Create Date: 2026-10-17 15:06:23.518904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f47a2d35'
+down_revision: Union[str, None] = 'b2d94f6a0e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_comments_post_roots', 'comments', ['post_id', 'created_at', 'id'], unique=False,
+                    postgresql_where=sa.text("parent_id IS NULL"))
+    op.create_index('ix_comments_parent_created', 'comments', ['parent_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_parent_created', table_name='comments')
+    op.drop_index('ix_comments_post_roots', table_name='comments')
@@ -0,0 +1,38 @@
+"""add user notification counters
+
+Revision ID: d5b7e03c9a61
+Revises: c8e1f47a2d35
+Create Date: 2026-10-17 15:32:40.271845
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b7e03c9a61'
+down_revision: Union[str, None] = 'c8e1f47a2d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('unread_notifications', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('users', sa.Column('notifications_version', sa.Integer(), nullable=True, server_default='0'))
+
+    op.execute("""
+        UPDATE users SET unread_notifications = unread.count
+        FROM (
+            SELECT user_id, COUNT(*) AS count FROM notifications
+            WHERE is_read = false
+            GROUP BY user_id
+        ) AS unread
+        WHERE users.id = unread.user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'notifications_version')
+    op.drop_column('users', 'unread_notifications')
@@ -0,0 +1,116 @@
+"""compact post views into monthly arrays
+
+Revision ID: d7f3a1c5e829
+Revises: c4e8f2a7b913
+Create Date: 2026-10-17 18:21:47.604193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3a1c5e829'
+down_revision: Union[str, None] = 'c4e8f2a7b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the daily table around under another name until it is converted
+    op.rename_table('post_views', 'post_views_daily')
+    op.execute('ALTER INDEX post_views_pkey RENAME TO post_views_daily_pkey')
+
+    op.create_table('post_views',
+    sa.Column('post_id', sa.String(length=36), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('daily_views', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('daily_unique_views', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.CheckConstraint('array_length(daily_views, 1) = 31', name='ck_post_views_daily_views_len'),
+    sa.CheckConstraint('array_length(daily_unique_views, 1) = 31', name='ck_post_views_daily_unique_views_len'),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'month')
+    )
+    op.create_table('post_view_sketches',
+    sa.Column('post_id', sa.String(length=36), nullable=False),
+    sa.Column('view_date', sa.Date(), nullable=False),
+    sa.Column('sketch', sa.LargeBinary(), nullable=False),
+    sa.Column('unique_views', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'view_date')
+    )
+
+    # One row per (post, month); days without a row become 0
+    op.execute("""
+        WITH daily AS (
+            SELECT post_id,
+                   date_trunc('month', view_date)::date AS month,
+                   extract(day FROM view_date)::int AS day,
+                   sum(coalesce(view_count, 0)) AS views,
+                   sum(coalesce(unique_views, 0)) AS unique_views,
+                   max(coalesce(updated_at, created_at)) AS updated_at
+            FROM post_views_daily
+            GROUP BY 1, 2, 3
+        ), months AS (
+            SELECT DISTINCT post_id, month FROM daily
+        )
+        INSERT INTO post_views (post_id, month, daily_views, daily_unique_views, updated_at)
+        SELECT m.post_id, m.month,
+               array_agg(coalesce(d.views, 0) ORDER BY s.day),
+               array_agg(coalesce(d.unique_views, 0) ORDER BY s.day),
+               coalesce(max(d.updated_at), now())
+        FROM months m
+        CROSS JOIN generate_series(1, 31) AS s(day)
+        LEFT JOIN daily d ON d.post_id = m.post_id AND d.month = m.month AND d.day = s.day
+        GROUP BY m.post_id, m.month
+    """)
+    # Days that can still get views keep their sketches
+    op.execute("""
+        INSERT INTO post_view_sketches (post_id, view_date, sketch, unique_views)
+        SELECT post_id, view_date::date, unique_sketch, coalesce(unique_views, 0)
+        FROM post_views_daily
+        WHERE unique_sketch IS NOT NULL AND view_date >= current_date - 1
+        ON CONFLICT DO NOTHING
+    """)
+
+    op.drop_table('post_views_daily')
+    op.create_index('ix_post_views_month', 'post_views', ['month'], unique=False)
+    op.create_index('ix_post_view_sketches_view_date', 'post_view_sketches', ['view_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.rename_table('post_views', 'post_views_monthly')
+    op.execute('ALTER INDEX post_views_pkey RENAME TO post_views_monthly_pkey')
+
+    op.create_table('post_views',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('post_id', sa.String(length=36), nullable=False),
+    sa.Column('view_date', sa.TIMESTAMP(), nullable=False),
+    sa.Column('view_count', sa.Integer(), nullable=True),
+    sa.Column('unique_sketch', sa.LargeBinary(), nullable=True),
+    sa.Column('unique_views', sa.Integer(), server_default='0', nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("""
+        INSERT INTO post_views (id, post_id, view_date, view_count, unique_sketch, unique_views, updated_at)
+        SELECT gen_random_uuid()::text, m.post_id, (m.month + (s.day - 1)::int)::timestamp,
+               s.views, k.sketch, s.unique_views, m.updated_at
+        FROM post_views_monthly m
+        CROSS JOIN unnest(m.daily_views, m.daily_unique_views) WITH ORDINALITY AS s(views, unique_views, day)
+        LEFT JOIN post_view_sketches k ON k.post_id = m.post_id AND k.view_date = m.month + (s.day - 1)::int
+        WHERE s.views > 0
+    """)
+
+    op.drop_index('ix_post_view_sketches_view_date', table_name='post_view_sketches')
+    op.drop_table('post_view_sketches')
+    op.drop_table('post_views_monthly')
+    op.create_index('ix_post_views_post_id', 'post_views', ['post_id'], unique=False)
+    op.create_index('ix_post_views_view_date', 'post_views', ['view_date'], unique=False)
+    op.create_index('ix_post_views_post_date', 'post_views', ['post_id', 'view_date'], unique=True)
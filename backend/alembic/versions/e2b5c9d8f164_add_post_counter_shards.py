@@ -0,0 +1,52 @@
+"""add post counter shards
+
+Revision ID: e2b5c9d8f164
+Revises: d7f3a1c5e829
+Create Date: 2026-10-17 18:56:13.207841
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b5c9d8f164'
+down_revision: Union[str, None] = 'd7f3a1c5e829'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blog_posts', sa.Column('counters_sharded', sa.Boolean(), nullable=False, server_default='false'))
+    op.create_table('post_counter_shards',
+    sa.Column('post_id', sa.String(length=36), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('likes_count', sa.Integer(), nullable=False),
+    sa.Column('comments_count', sa.Integer(), nullable=False),
+    sa.Column('view_count', sa.Integer(), nullable=False),
+    sa.Column('unique_views', sa.Integer(), nullable=False),
+    sa.Column('writes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'shard')
+    )
+
+
+def downgrade() -> None:
+    # Fold what is left in the shards before dropping them
+    op.execute("""
+        UPDATE blog_posts p SET
+            likes_count = greatest(coalesce(p.likes_count, 0) + s.likes_count, 0),
+            comments_count = greatest(coalesce(p.comments_count, 0) + s.comments_count, 0),
+            view_count = greatest(coalesce(p.view_count, 0) + s.view_count, 0),
+            unique_views = greatest(coalesce(p.unique_views, 0) + s.unique_views, 0)
+        FROM (
+            SELECT post_id, sum(likes_count) AS likes_count, sum(comments_count) AS comments_count,
+                   sum(view_count) AS view_count, sum(unique_views) AS unique_views
+            FROM post_counter_shards GROUP BY post_id
+        ) s
+        WHERE p.id = s.post_id
+    """)
+    op.drop_table('post_counter_shards')
+    op.drop_column('blog_posts', 'counters_sharded')
@@ -0,0 +1,41 @@
+"""add feed keyset pagination indexes
+
+Revision ID: e4a1c7d2b9f0
+Revises: d90e7c888485
+Create Date: 2026-10-17 10:12:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a1c7d2b9f0'
+down_revision: Union[str, None] = 'd90e7c888485'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Row-value comparisons skip NULLs, so backfill sort keys used by the feed cursor
+    op.execute("UPDATE blog_posts SET likes_count = 0 WHERE likes_count IS NULL")
+    op.execute("UPDATE blog_posts SET view_count = 0 WHERE view_count IS NULL")
+    op.execute(
+        "UPDATE blog_posts SET published_at = COALESCE(updated_at, created_at, now()) "
+        "WHERE status = 'published' AND published_at IS NULL"
+    )
+
+    op.create_index('ix_blog_posts_feed_recent', 'blog_posts', ['published_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'published'"))
+    op.create_index('ix_blog_posts_feed_popular', 'blog_posts', ['likes_count', 'published_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'published'"))
+    op.create_index('ix_blog_posts_feed_trending', 'blog_posts', ['view_count', 'published_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'published'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blog_posts_feed_trending', table_name='blog_posts')
+    op.drop_index('ix_blog_posts_feed_popular', table_name='blog_posts')
+    op.drop_index('ix_blog_posts_feed_recent', table_name='blog_posts')
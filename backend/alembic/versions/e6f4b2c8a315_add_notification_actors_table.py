@@ -0,0 +1,45 @@
+"""add notification actors table
+
+Revision ID: e6f4b2c8a315
+Revises: c3a7e5b92d48
+Create Date: 2026-10-17 21:05:43.527310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f4b2c8a315'
+down_revision: Union[str, None] = 'c3a7e5b92d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_actors',
+    sa.Column('notification_id', sa.String(length=36), nullable=False),
+    sa.Column('actor_id', sa.String(length=36), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('notification_id', 'actor_id')
+    )
+
+    # Open groups start with the actors they still know about
+    op.execute("""
+        INSERT INTO notification_actors (notification_id, actor_id, created_at)
+        SELECT n.id, a.actor_id, n.created_at
+        FROM notifications n
+        CROSS JOIN jsonb_array_elements_text(
+            COALESCE(n.sample_actor_ids, jsonb_build_array(n.actor_id))
+        ) AS a(actor_id)
+        JOIN users u ON u.id = a.actor_id
+        WHERE n.is_read = false AND n.type IN ('like', 'follow', 'comment')
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('notification_actors')
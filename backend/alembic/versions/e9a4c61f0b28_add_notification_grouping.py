@@ -0,0 +1,30 @@
+"""add notification grouping
+
+Revision ID: e9a4c61f0b28
+Revises: d5b7e03c9a61
+Create Date: 2026-10-17 15:58:14.603392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9a4c61f0b28'
+down_revision: Union[str, None] = 'd5b7e03c9a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows stay ungrouped; sample_actor_ids falls back to actor_id when NULL
+    op.add_column('notifications', sa.Column('actor_count', sa.Integer(), nullable=True, server_default='1'))
+    op.add_column('notifications', sa.Column('sample_actor_ids', postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications', 'sample_actor_ids')
+    op.drop_column('notifications', 'actor_count')
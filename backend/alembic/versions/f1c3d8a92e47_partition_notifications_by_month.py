@@ -0,0 +1,111 @@
+"""partition notifications by month
+
+Revision ID: f1c3d8a92e47
+Revises: e9a4c61f0b28
+Create Date: 2026-10-17 16:24:51.930217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c3d8a92e47'
+down_revision: Union[str, None] = 'e9a4c61f0b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of empty partitions created ahead of the current one; the retention
+# job (app.scripts.notification_retention) keeps extending this
+PARTITIONS_AHEAD = 3
+
+COLUMNS = "id, user_id, actor_id, type, post_id, comment_id, is_read, actor_count, sample_actor_ids, created_at"
+
+
+def upgrade() -> None:
+    op.drop_index('ix_notifications_user_id', table_name='notifications')
+    op.drop_index('ix_notifications_is_read', table_name='notifications')
+    op.drop_index('ix_notifications_created_at', table_name='notifications')
+    op.execute("ALTER TABLE notifications RENAME TO notifications_unpartitioned")
+    op.execute("ALTER TABLE notifications_unpartitioned RENAME CONSTRAINT notifications_pkey TO notifications_unpartitioned_pkey")
+
+    # The partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE notifications (
+            id VARCHAR(36) NOT NULL,
+            user_id VARCHAR(36) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            actor_id VARCHAR(36) NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            type VARCHAR(20) NOT NULL,
+            post_id VARCHAR(36) REFERENCES blog_posts(id) ON DELETE CASCADE,
+            comment_id VARCHAR(36) REFERENCES comments(id) ON DELETE CASCADE,
+            is_read BOOLEAN DEFAULT false,
+            actor_count INTEGER DEFAULT 1,
+            sample_actor_ids JSONB,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN SELECT generate_series(
+                date_trunc('month', COALESCE((SELECT min(created_at) FROM notifications_unpartitioned), now())),
+                date_trunc('month', now()) + interval '{PARTITIONS_AHEAD} months',
+                interval '1 month'
+            ) LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF notifications FOR VALUES FROM (%L) TO (%L)',
+                    'notifications_' || to_char(month, '"y"YYYY"m"MM'), month, month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+    """)
+
+    # Indexes on the parent are created on every partition, present and future
+    op.execute("CREATE INDEX ix_notifications_user_unread ON notifications (user_id, is_read, created_at DESC)")
+    op.execute("CREATE INDEX ix_notifications_user_created ON notifications (user_id, created_at DESC)")
+
+    op.execute(f"""
+        INSERT INTO notifications ({COLUMNS})
+        SELECT id, user_id, actor_id, type, post_id, comment_id, is_read, actor_count, sample_actor_ids,
+               COALESCE(created_at, now())
+        FROM notifications_unpartitioned
+    """)
+    op.execute("DROP TABLE notifications_unpartitioned")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE notifications RENAME TO notifications_partitioned")
+    op.execute("ALTER TABLE notifications_partitioned RENAME CONSTRAINT notifications_pkey TO notifications_partitioned_pkey")
+    op.execute("ALTER INDEX ix_notifications_user_unread RENAME TO ix_notifications_partitioned_user_unread")
+    op.execute("ALTER INDEX ix_notifications_user_created RENAME TO ix_notifications_partitioned_user_created")
+
+    op.create_table('notifications',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('actor_id', sa.String(length=36), nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('post_id', sa.String(length=36), nullable=True),
+    sa.Column('comment_id', sa.String(length=36), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('actor_count', sa.Integer(), nullable=True, server_default='1'),
+    sa.Column('sample_actor_ids', postgresql.JSONB(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['comment_id'], ['comments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f"INSERT INTO notifications ({COLUMNS}) SELECT {COLUMNS} FROM notifications_partitioned")
+    op.execute("DROP TABLE notifications_partitioned")
+
+    op.create_index('ix_notifications_created_at', 'notifications', ['created_at'], unique=False)
+    op.create_index('ix_notifications_is_read', 'notifications', ['is_read'], unique=False)
+    op.create_index('ix_notifications_user_id', 'notifications', ['user_id'], unique=False)
@@ -0,0 +1,42 @@
+"""add post_trending_scores table
+
+Revision ID: f3b8e2a61c4d
+Revises: e4a1c7d2b9f0
+Create Date: 2026-10-17 11:03:17.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8e2a61c4d'
+down_revision: Union[str, None] = 'e4a1c7d2b9f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('post_trending_scores',
+    sa.Column('post_id', sa.String(length=36), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('last_activity_at', sa.TIMESTAMP(), nullable=False),
+    sa.Column('computed_at', sa.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_index('ix_post_trending_scores_score', 'post_trending_scores', ['score'], unique=False)
+    op.create_index('ix_post_trending_scores_last_activity_at', 'post_trending_scores', ['last_activity_at'], unique=False)
+
+    # The trending feed no longer sorts by all-time view_count
+    op.drop_index('ix_blog_posts_feed_trending', table_name='blog_posts')
+
+
+def downgrade() -> None:
+    op.create_index('ix_blog_posts_feed_trending', 'blog_posts', ['view_count', 'published_at', 'id'], unique=False,
+                    postgresql_where=sa.text("status = 'published'"))
+    op.drop_index('ix_post_trending_scores_last_activity_at', table_name='post_trending_scores')
+    op.drop_index('ix_post_trending_scores_score', table_name='post_trending_scores')
+    op.drop_table('post_trending_scores')
@@ -0,0 +1,26 @@
+"""add user token version
+
+Revision ID: f8c1a6e3b207
+Revises: e2b5c9d8f164
+Create Date: 2026-10-17 19:24:38.915062
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8c1a6e3b207'
+down_revision: Union[str, None] = 'e2b5c9d8f164'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
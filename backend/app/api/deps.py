@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from app.models.base import get_db
 from app.models import User
 from app.core.security import verify_token
+from app.services.principal_cache import Principal, principal_cache
 
 security = HTTPBearer()
 optional_security = HTTPBearer(auto_error=False)
@@ -19,6 +20,18 @@ def get_db_session() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+def principal_from_token(token: str) -> Optional[Principal]:
+    """Principal from a verified JWT, without touching the database"""
+    payload = verify_token(token)
+    if payload is None:
+        return None
+
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        return None
+
+    return Principal(id=user_id, token_version=payload.get("ver", 0))
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db_session)
@@ -26,25 +39,17 @@ def get_current_user(
     """
     Get current authenticated user from JWT token
     """
-    token = credentials.credentials
-    payload = verify_token(token)
+    principal = principal_from_token(credentials.credentials)
 
-    if payload is None:
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    user = db.query(User).filter(User.id == user_id).first()
+    # Served from the principal cache when the user was seen recently
+    user = principal.resolve(db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,18 +69,31 @@ def get_current_user_optional(
     if credentials is None:
         return None
 
-    token = credentials.credentials
-    payload = verify_token(token)
-
-    if payload is None:
+    principal = principal_from_token(credentials.credentials)
+    if principal is None:
         return None
 
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    return principal.resolve(db)
+
+def get_principal_optional(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[Principal]:
+    """
+    Get the token's principal if authenticated, None otherwise. For public
+    endpoints that only need the viewer's id; the user is never loaded.
+
+    Revoked tokens are treated as anonymous when the principal cache knows
+    the user's current token_version. Without a cache entry the token is
+    accepted as is: a revoked token can still personalize public pages
+    (likes, follows) until it expires, but never reaches the user's data.
+    """
+    if credentials is None:
         return None
 
-    user = db.query(User).filter(User.id == user_id).first()
-    return user
+    principal = principal_from_token(credentials.credentials)
+    if principal is not None and principal_cache.is_revoked(principal.id, principal.token_version):
+        return None
+    return principal
 
 
 def get_current_active_user(
@@ -7,8 +7,9 @@ from datetime import datetime
 from app.api.deps import get_db_session, get_current_active_user
 from app.models import User
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import create_access_token, password_hasher
 from app.schemas.auth import EmailRegister, EmailLogin, Token
+from app.services.feed_cache import feed_cache
 
 router = APIRouter()
 
@@ -32,7 +33,7 @@ async def register(user_data: EmailRegister, db: Session = Depends(get_db_sessio
         id=str(uuid.uuid4()),
         username=user_data.username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await password_hasher.hash(user_data.password),
         is_github_connected=False,
         is_active=True,
         created_at=datetime.utcnow(),
@@ -43,7 +44,7 @@ async def register(user_data: EmailRegister, db: Session = Depends(get_db_sessio
     db.commit()
     db.refresh(new_user)
 
-    access_token = create_access_token(data={"sub": new_user.id, "username": new_user.username})
+    access_token = create_access_token(data={"sub": new_user.id, "username": new_user.username, "ver": new_user.token_version or 0})
 
     return Token(
         access_token=access_token,
@@ -72,7 +73,8 @@ async def login(credentials: EmailLogin, db: Session = Depends(get_db_session)):
             detail="This account uses GitHub login. Please login with GitHub."
         )
 
-    if not verify_password(credentials.password, user.password_hash):
+    verified, new_hash = await password_hasher.verify_and_update(credentials.password, user.password_hash)
+    if not verified:
         raise HTTPException(
             status_code=401,
             detail="Incorrect email or password"
@@ -94,7 +96,12 @@ async def login(credentials: EmailLogin, db: Session = Depends(get_db_session)):
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
-    access_token = create_access_token(data={"sub": user.id, "username": user.username})
+    if new_hash:
+        # Stored with an older bcrypt cost
+        user.password_hash = new_hash
+        db.commit()
+
+    access_token = create_access_token(data={"sub": user.id, "username": user.username, "ver": user.token_version or 0})
 
     return Token(
         access_token=access_token,
@@ -346,7 +353,7 @@ async def github_callback(code: str, db: Session = Depends(get_db_session)):
         db.refresh(new_user)
         user = new_user
 
-    jwt_token = create_access_token(data={"sub": user.id, "username": user.username})
+    jwt_token = create_access_token(data={"sub": user.id, "username": user.username, "ver": user.token_version or 0})
 
     redirect_url = f"{settings.FRONTEND_URL}/auth/callback?token={jwt_token}&user_id={user.id}"
     return RedirectResponse(url=redirect_url)
@@ -360,7 +367,7 @@ async def refresh_token(current_user_id: str, db: Session = Depends(get_db_sessi
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    new_token = create_access_token(data={"sub": user.id, "username": user.username})
+    new_token = create_access_token(data={"sub": user.id, "username": user.username, "ver": user.token_version or 0})
     return {"access_token": new_token, "token_type": "bearer"}
 
 # Account Management
@@ -380,10 +387,14 @@ async def delete_account(
 
     current_user.deleted_at = datetime.utcnow()
     current_user.is_active = False
+    # Sign out every session; restoring the account issues a new token
+    current_user.token_version = (current_user.token_version or 0) + 1
     current_user.updated_at = datetime.utcnow()
 
     db.commit()
 
+    feed_cache.invalidate_author(current_user.id)
+
     return {
         "message": "Account deletion scheduled",
         "deleted_at": current_user.deleted_at,
@@ -400,8 +411,6 @@ async def restore_account(
     """
     Restore a soft-deleted account (within 7 days)
     """
-    from app.core.security import verify_password
-
     user = db.query(User).filter(User.email == email).first()
 
     if not user:
@@ -416,7 +425,7 @@ async def restore_account(
             detail="This account uses GitHub login. Please contact support to restore."
         )
 
-    if not verify_password(password, user.password_hash):
+    if not await password_hasher.verify(password, user.password_hash):
         raise HTTPException(status_code=401, detail="Incorrect password")
 
     deletion_deadline = user.deleted_at + __import__('datetime').timedelta(days=7)
@@ -433,7 +442,10 @@ async def restore_account(
     db.commit()
     db.refresh(user)
 
-    access_token = create_access_token(data={"sub": user.id, "username": user.username})
+    # Restored author's posts reappear anywhere in the feed
+    feed_cache.invalidate()
+
+    access_token = create_access_token(data={"sub": user.id, "username": user.username, "ver": user.token_version or 0})
 
     return {
         "message": "Account restored successfully",
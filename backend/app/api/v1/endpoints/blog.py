@@ -1,15 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from fastapi.responses import JSONResponse, FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, undefer_group
 from typing import List, Optional
 from datetime import datetime
 import uuid
 import base64
 import os
 from app.api.deps import get_db_session, get_current_user
-from app.models import BlogPost, BlogFolder, Series, User
+from app.models import BlogPost, BlogFolder, Series, User, Notification, PostLike
+from app.api.v1.endpoints.notifications import discard_notifications
+from app.services.feed_cache import feed_cache
+from app.services import timeline_service
+from app.services import notification_fanout
+from app.services import user_stats_service
+from app.services import post_counters
 from app.schemas.blog import (
-    BlogPostCreate, BlogPostUpdate, BlogPostResponse,
+    BlogPostCreate, BlogPostUpdate, BlogPostResponse, BlogPostListItem,
     BlogFolderCreate, BlogFolderUpdate, BlogFolderResponse,
     SeriesCreate, SeriesUpdate, SeriesResponse
 )
@@ -198,26 +205,40 @@ def delete_folder(
 
 
 # Blog Post endpoints
-@router.get("/posts", response_model=List[BlogPostResponse])
+LIST_COLUMNS = (
+    BlogPost.id, BlogPost.user_id, BlogPost.series_id, BlogPost.folder_id,
+    BlogPost.github_repo_id, BlogPost.github_path, BlogPost.github_sha,
+    BlogPost.title, BlogPost.slug, BlogPost.excerpt, BlogPost.cover_image, BlogPost.tags,
+    BlogPost.status, BlogPost.published_at, BlogPost.view_count, BlogPost.likes_count,
+    BlogPost.created_at, BlogPost.updated_at,
+)
+
+
+@router.get("/posts", response_model=List[BlogPostListItem])
 def get_posts(
     folder_id: Optional[str] = None,
     post_status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    include_content: bool = False,
     db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get blog posts for current user"""
-    query = db.query(BlogPost).filter(BlogPost.user_id == current_user.id)
+    """Get blog posts for current user (without content_md/content_blocks unless include_content)"""
+    columns = LIST_COLUMNS
+    if include_content:
+        columns = columns + (BlogPost.content_md, BlogPost.content_blocks)
+
+    stmt = select(*columns).where(BlogPost.user_id == current_user.id)
 
     if folder_id:
-        query = query.filter(BlogPost.folder_id == folder_id)
+        stmt = stmt.where(BlogPost.folder_id == folder_id)
 
     if post_status:
-        query = query.filter(BlogPost.status == post_status)
+        stmt = stmt.where(BlogPost.status == post_status)
 
-    posts = query.order_by(BlogPost.updated_at.desc()).offset(skip).limit(limit).all()
-    return posts
+    stmt = stmt.order_by(BlogPost.updated_at.desc()).offset(skip).limit(limit)
+    return db.execute(stmt).all()
 
 
 @router.get("/posts/{post_id}", response_model=BlogPostResponse)
@@ -227,7 +248,7 @@ def get_post(
     current_user: User = Depends(get_current_user)
 ):
     """Get blog post by ID"""
-    post = db.query(BlogPost).filter(
+    post = db.query(BlogPost).options(undefer_group("content")).filter(
         BlogPost.id == post_id,
         BlogPost.user_id == current_user.id
     ).first()
@@ -287,9 +308,19 @@ def create_post(
     )
 
     db.add(new_post)
+
+    if new_post.status == "published":
+        db.flush()
+        notification_fanout.enqueue_timeline(db, new_post)
+        notification_fanout.enqueue_post(db, new_post)
+        user_stats_service.bump(db, current_user.id, posts_count=1)
+
     db.commit()
     db.refresh(new_post)
 
+    if new_post.status == "published":
+        feed_cache.invalidate()
+
     return new_post
 
 
@@ -335,6 +366,8 @@ def update_post(
         if not folder:
             raise HTTPException(status_code=404, detail="Folder not found")
 
+    was_published = post.status == "published"
+
     if "status" in update_data:
         if update_data["status"] == "published" and post.status != "published":
             post.published_at = datetime.utcnow()
@@ -346,9 +379,22 @@ def update_post(
 
     post.updated_at = datetime.utcnow()
 
+    if not was_published and post.status == "published":
+        notification_fanout.enqueue_timeline(db, post)
+        notification_fanout.enqueue_post(db, post)
+        user_stats_service.bump(db, current_user.id, posts_count=1)
+    elif was_published and post.status != "published":
+        timeline_service.remove_post(db, post.id)
+        user_stats_service.bump(db, current_user.id, posts_count=-1)
+
     db.commit()
     db.refresh(post)
 
+    if was_published != (post.status == "published"):
+        feed_cache.invalidate()
+    elif was_published:
+        feed_cache.invalidate_post(post.id)
+
     return post
 
 
@@ -366,9 +412,33 @@ def delete_post(
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
+    was_published = post.status == "published"
+
+    discard_notifications(db, Notification.post_id == post.id)
+
+    # The post's totals leave the author's stats, and its likes leave each liker's likes_given
+    counts = post_counters.totals(db, post.id) if post.counters_sharded else post
+    likers = db.query(PostLike.user_id, func.count(PostLike.id)).filter(
+        PostLike.post_id == post.id
+    ).group_by(PostLike.user_id).all()
+    user_stats_service.bump_many(db, [
+        {
+            "user_id": current_user.id,
+            "posts_count": -1 if was_published else 0,
+            "views_count": -(counts.view_count or 0),
+            "unique_views_count": -(counts.unique_views or 0),
+            "likes_received": -(counts.likes_count or 0),
+            "comments_received": -(counts.comments_count or 0),
+        },
+        *[{"user_id": user_id, "likes_given": -count} for user_id, count in likers],
+    ])
+
     db.delete(post)
     db.commit()
 
+    if was_published:
+        feed_cache.invalidate_post(post_id)
+
     return None
 
 
@@ -1,84 +1,233 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, joinedload, undefer_group, aliased
+from sqlalchemy import func, desc, tuple_, select, or_, literal, delete
+from sqlalchemy.dialects.postgresql import insert
+from typing import List, Optional, Union
 from datetime import datetime, date
+import hashlib
+import re
 import uuid
 
-from app.api.deps import get_db_session, get_current_user_optional, get_current_user
-from app.models import User, BlogPost, PostLike, Follow, Comment, Notification, PostView
-from app.api.v1.endpoints.notifications import create_notification
-from app.schemas.blog import BlogPostPublic, BlogPostDetailPublic, AuthorPublic, CommentCreate, CommentUpdate, CommentResponse
+from app.api.deps import get_db_session, get_principal_optional, get_current_user
+from app.models import User, BlogPost, PostLike, Follow, Comment, Notification, PostTrendingScore
+from app.api.v1.endpoints.notifications import create_notification, retract_notification
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.services.feed_cache import feed_cache
+from app.services.view_buffer import view_buffer
+from app.services import timeline_service
+from app.services import user_stats_service
+from app.services import post_counters
+from app.services.relationship_service import RelationshipResolver
+from app.services.principal_cache import Principal
+from app.services.post_queries import post_cards_select, card_to_public
+from app.schemas.blog import BlogPostPublic, BlogPostDetailPublic, FeedPage, AuthorPublic, CommentCreate, CommentUpdate, CommentResponse, CommentPage
 from app.schemas.social import (
     UserPublicProfile,
     FollowResponse,
     FollowerUser,
     LikeResponse,
+    LikedStatesRequest,
+    LikedStatesResponse,
     UserBioUpdate
 )
 
 router = APIRouter()
 
 
-def post_to_public(post: BlogPost, author: User) -> dict:
-    """Convert post to public response with author info"""
-    return {
-        "id": post.id,
-        "title": post.title,
-        "slug": post.slug,
-        "excerpt": post.excerpt,
-        "cover_image": post.cover_image,
-        "tags": post.tags,
-        "status": post.status,
-        "published_at": post.published_at,
-        "view_count": post.view_count,
-        "likes_count": post.likes_count or 0,
-        "comments_count": post.comments_count or 0,
-        "created_at": post.created_at,
-        "author": {
-            "id": author.id,
-            "username": author.username,
-            "github_username": author.github_username,
-            "avatar_url": author.avatar_url,
-            "bio": author.bio
+def with_viewer_state(posts: List[dict], relationships: RelationshipResolver) -> List[dict]:
+    """
+    Add liked_by_me/author_followed to serialized posts for an authenticated viewer.
+    Likes and follows for the whole page are resolved in one batched query each.
+    Posts are copied because they may be shared feed_cache entries.
+    """
+    if relationships.viewer_id is None:
+        return posts
+
+    relationships.prefetch_likes(post["id"] for post in posts)
+    relationships.prefetch(post["author"]["id"] for post in posts)
+
+    return [
+        {
+            **post,
+            "liked_by_me": relationships.has_liked(post["id"]),
+            "author_followed": relationships.is_following(post["author"]["id"]),
         }
-    }
+        for post in posts
+    ]
+
+
+# Sort key given to posts without a trending score (no activity in the window):
+# below every real score, so they follow the scored posts newest first
+UNSCORED_TRENDING_SCORE = -1.0e300
+
+FEED_SORT_COLUMNS = {
+    "recent": [BlogPost.published_at, BlogPost.id],
+    "popular": [BlogPost.likes_count, BlogPost.published_at, BlogPost.id],
+    "trending": [PostTrendingScore.score, BlogPost.published_at, BlogPost.id],
+    "following": [BlogPost.published_at, BlogPost.id],  # home timeline, see get_following_feed
+}
+
+
+def _feed_cursor_key(cursor: str, sort_by: str) -> list:
+    """Decode a feed cursor into sort key values matching FEED_SORT_COLUMNS"""
+    try:
+        mode, key = decode_cursor(cursor)
+        if mode != sort_by or len(key) != len(FEED_SORT_COLUMNS[sort_by]):
+            raise ValueError("Cursor does not match sort mode")
+        # Key layout is [likes_count | score, published_at, id]
+        key[-2] = datetime.fromisoformat(key[-2])
+        if not isinstance(key[-1], str):
+            raise ValueError("Cursor id is not a string")
+        if len(key) == 3 and (isinstance(key[0], bool) or not isinstance(key[0], (int, float))):
+            raise ValueError("Cursor count is not a number")
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def _feed_query(sort_by: str):
+    """Published cards of active authors in feed order, with the sort key as trailing columns"""
+    columns = FEED_SORT_COLUMNS[sort_by]
+
+    stmt = post_cards_select(
+        *[column.label(f"sort_{i}") for i, column in enumerate(columns)]
+    ).where(
+        BlogPost.status == "published",
+        User.is_active == True
+    )
+
+    if sort_by == "trending":
+        stmt = stmt.join(PostTrendingScore, PostTrendingScore.post_id == BlogPost.id)
 
+    return stmt.order_by(*[desc(column) for column in columns])
 
-@router.get("/feed", response_model=List[BlogPostPublic])
+
+def _unscored_trending_query():
+    """Published cards without a trending score, newest first, keyed like the trending feed"""
+    return post_cards_select(
+        literal(UNSCORED_TRENDING_SCORE).label("sort_0"),
+        BlogPost.published_at.label("sort_1"),
+        BlogPost.id.label("sort_2"),
+    ).outerjoin(
+        PostTrendingScore, PostTrendingScore.post_id == BlogPost.id
+    ).where(
+        BlogPost.status == "published",
+        User.is_active == True,
+        PostTrendingScore.post_id.is_(None)
+    ).order_by(desc(BlogPost.published_at), desc(BlogPost.id))
+
+
+def _feed_entries(rows, sort_by: str) -> list:
+    """Convert card rows into feed cache entries"""
+    key_size = len(FEED_SORT_COLUMNS[sort_by])
+    return [(tuple(row[-key_size:]), row.author_id, card_to_public(row)) for row in rows]
+
+
+def _feed_page(db: Session, sort_by: str, limit: int, key: Optional[tuple] = None, offset: int = 0) -> list:
+    """Up to limit feed entries sorted after key (cursor mode) or from offset (page mode)"""
+    columns = FEED_SORT_COLUMNS[sort_by]
+    stmt = _feed_query(sort_by)
+    entries = []
+
+    if sort_by != "trending" or key is None or key[0] != UNSCORED_TRENDING_SCORE:
+        if key is not None:
+            stmt = stmt.where(tuple_(*columns) < tuple_(*key))
+        entries = _feed_entries(db.execute(stmt.offset(offset).limit(limit)).all(), sort_by)
+        if sort_by != "trending" or len(entries) == limit:
+            return entries
+
+        # Scored posts (read in ix_post_trending_scores_score order) ran out;
+        # continue with the unscored ones from their start
+        if not entries and offset:
+            offset -= db.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar()
+        else:
+            offset = 0
+        key = None
+
+    unscored = _unscored_trending_query()
+    if key is not None:
+        unscored = unscored.where(tuple_(BlogPost.published_at, BlogPost.id) < tuple_(*key[1:]))
+    rows = db.execute(unscored.offset(offset).limit(limit - len(entries))).all()
+    return entries + _feed_entries(rows, sort_by)
+
+
+@router.get("/feed", response_model=Union[List[BlogPostPublic], FeedPage])
 def get_feed(
     sort_by: str = Query("recent", enum=["recent", "popular", "trending"]),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor; pass an empty value for the first page"),
     db: Session = Depends(get_db_session),
-    current_user: Optional[User] = Depends(get_current_user_optional)
+    current_user: Optional[Principal] = Depends(get_principal_optional)
 ):
     """
     Get public feed of published posts
     - recent: sorted by published_at desc
     - popular: sorted by likes_count desc
-    - trending: sorted by view_count desc (recent 7 days)
+    - trending: sorted by time-decayed views and likes over the trending window
+      (precomputed in post_trending_scores); posts without activity in the
+      window follow, newest first
+
+    Without `cursor` the legacy page/limit mode returns a plain list.
+    With `cursor` (empty for the first page) the feed is keyset-paginated and
+    returned as a FeedPage envelope carrying `next_cursor`.
+
+    The first FEED_CACHE_SIZE posts of each mode are served from feed_cache.
     """
-    query = db.query(BlogPost).join(User).filter(
-        BlogPost.status == "published",
-        User.is_active == True
-    )
+    relationships = RelationshipResolver(db, current_user.id if current_user else None)
+    cached = feed_cache.get(sort_by, lambda size: _feed_page(db, sort_by, size))
 
-    if sort_by == "recent":
-        query = query.order_by(desc(BlogPost.published_at))
-    elif sort_by == "popular":
-        query = query.order_by(desc(BlogPost.likes_count), desc(BlogPost.published_at))
-    elif sort_by == "trending":
-        query = query.order_by(desc(BlogPost.view_count), desc(BlogPost.published_at))
+    if cursor is None:
+        offset = (page - 1) * limit
+        entries = cached.page(offset, limit)
+        if entries is None:
+            entries = _feed_page(db, sort_by, limit, offset=offset)
+        return with_viewer_state([entry[2] for entry in entries], relationships)
 
-    offset = (page - 1) * limit
-    posts = query.offset(offset).limit(limit).all()
+    key = tuple(_feed_cursor_key(cursor, sort_by)) if cursor else None
 
-    result = []
-    for post in posts:
-        result.append(post_to_public(post, post.user))
+    entries = cached.after(key, limit)
+    if entries is None:
+        # Fetch one extra row to know whether another page exists
+        entries = _feed_page(db, sort_by, limit + 1, key=key)
 
-    return result
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(sort_by, list(entries[-1][0]))
+
+    return {
+        "posts": with_viewer_state([entry[2] for entry in entries], relationships),
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/feed/following", response_model=FeedPage)
+def get_following_feed(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_db_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the home timeline: published posts from users the current user follows"""
+    key = tuple(_feed_cursor_key(cursor, "following")) if cursor else None
+
+    rows = timeline_service.read_timeline(db, current_user.id, key, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor("following", [rows[-1].published_at, rows[-1].id])
+
+    posts = [card_to_public(row) for row in rows]
+
+    return {
+        "posts": with_viewer_state(posts, RelationshipResolver(db, current_user.id)),
+        "next_cursor": next_cursor,
+    }
 
 
 @router.get("/feed/liked", response_model=List[BlogPostPublic])
@@ -89,28 +238,24 @@ def get_liked_posts(
     current_user: User = Depends(get_current_user)
 ):
     """Get posts liked by current user"""
-    query = db.query(BlogPost).join(PostLike).join(
-        User, BlogPost.user_id == User.id
-    ).filter(
+    stmt = post_cards_select().join(PostLike, PostLike.post_id == BlogPost.id).where(
         PostLike.user_id == current_user.id,
         BlogPost.status == "published"
     ).order_by(desc(PostLike.created_at))
 
     offset = (page - 1) * limit
-    posts = query.offset(offset).limit(limit).all()
+    rows = db.execute(stmt.offset(offset).limit(limit)).all()
 
-    result = []
-    for post in posts:
-        result.append(post_to_public(post, post.user))
+    result = [card_to_public(row) for row in rows]
 
-    return result
+    return with_viewer_state(result, RelationshipResolver(db, current_user.id))
 
 
 @router.get("/users/{username}", response_model=UserPublicProfile)
 def get_user_profile(
     username: str,
     db: Session = Depends(get_db_session),
-    current_user: Optional[User] = Depends(get_current_user_optional)
+    current_user: Optional[Principal] = Depends(get_principal_optional)
 ):
     """Get public user profile"""
     user = db.query(User).filter(
@@ -121,28 +266,12 @@ def get_user_profile(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Count followers/following/posts
-    followers_count = db.query(func.count(Follow.id)).filter(
-        Follow.following_id == user.id
-    ).scalar()
-
-    following_count = db.query(func.count(Follow.id)).filter(
-        Follow.follower_id == user.id
-    ).scalar()
-
-    posts_count = db.query(func.count(BlogPost.id)).filter(
-        BlogPost.user_id == user.id,
-        BlogPost.status == "published"
-    ).scalar()
+    stats = user_stats_service.get_user_stats(db, user.id)
 
     # Check if current user is following
     is_following = False
     if current_user and current_user.id != user.id:
-        follow = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == user.id
-        ).first()
-        is_following = follow is not None
+        is_following = RelationshipResolver(db, current_user.id).is_following(user.id)
 
     # Parse social_links
     social_links = None
@@ -158,9 +287,9 @@ def get_user_profile(
         "social_links": social_links,
         "is_github_connected": user.is_github_connected,
         "created_at": user.created_at,
-        "followers_count": followers_count,
-        "following_count": following_count,
-        "posts_count": posts_count,
+        "followers_count": stats["followers_count"],
+        "following_count": stats["following_count"],
+        "posts_count": stats["posts_count"],
         "is_following": is_following
     }
 
@@ -170,7 +299,8 @@ def get_user_posts(
     username: str,
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_db_session),
+    current_user: Optional[Principal] = Depends(get_principal_optional)
 ):
     """Get published posts by user"""
     user = db.query(User).filter(
@@ -181,26 +311,45 @@ def get_user_posts(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    query = db.query(BlogPost).filter(
+    stmt = post_cards_select().where(
         BlogPost.user_id == user.id,
         BlogPost.status == "published"
     ).order_by(desc(BlogPost.published_at))
 
     offset = (page - 1) * limit
-    posts = query.offset(offset).limit(limit).all()
+    rows = db.execute(stmt.offset(offset).limit(limit)).all()
 
-    result = []
-    for post in posts:
-        result.append(post_to_public(post, user))
+    result = [card_to_public(row) for row in rows]
 
-    return result
+    return with_viewer_state(result, RelationshipResolver(db, current_user.id if current_user else None))
+
+
+CRAWLER_PATTERN = re.compile(r"bot|crawl|spider|slurp|facebookexternalhit|preview|curl|wget|python-requests|httpx", re.I)
+
+
+def _viewer_key(request: Request, current_user: Optional[Principal]) -> Optional[str]:
+    """Identity used for unique viewer counting; None for crawlers"""
+    user_agent = request.headers.get("user-agent", "")
+    if not user_agent or CRAWLER_PATTERN.search(user_agent):
+        return None
+
+    if current_user:
+        return f"user:{current_user.id}"
+
+    # Clients can put anything in X-Forwarded-For; uvicorn's proxy headers
+    # support already resolves client.host from it for trusted proxies only
+    # (FORWARDED_ALLOW_IPS)
+    client_ip = request.client.host if request.client else ""
+    return "anon:" + hashlib.sha256(f"{client_ip}|{user_agent}".encode("utf-8")).hexdigest()
 
 
 @router.get("/users/{username}/posts/{slug}", response_model=BlogPostDetailPublic)
 def get_user_post(
     username: str,
     slug: str,
-    db: Session = Depends(get_db_session)
+    request: Request,
+    db: Session = Depends(get_db_session),
+    current_user: Optional[Principal] = Depends(get_principal_optional)
 ):
     """Get a specific published post by user and slug"""
     user = db.query(User).filter(
@@ -211,7 +360,7 @@ def get_user_post(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    post = db.query(BlogPost).filter(
+    post = db.query(BlogPost).options(undefer_group("content")).filter(
         BlogPost.user_id == user.id,
         BlogPost.slug == slug,
         BlogPost.status == "published"
@@ -220,28 +369,12 @@ def get_user_post(
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    # Increment view count
-    post.view_count = (post.view_count or 0) + 1
-
-    # Track view history by date
+    # Count the view; view_buffer writes post_views and view_count in batches
     today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    existing_view = db.query(PostView).filter(
-        PostView.post_id == post.id,
-        PostView.view_date == today
-    ).first()
+    view_buffer.record(post.id, today, viewer_key=_viewer_key(request, current_user))
 
-    if existing_view:
-        existing_view.view_count += 1
-    else:
-        new_view = PostView(
-            id=str(uuid.uuid4()),
-            post_id=post.id,
-            view_date=today,
-            view_count=1
-        )
-        db.add(new_view)
-
-    db.commit()
+    # Hot posts also have counter changes not yet folded into blog_posts
+    counts = post_counters.totals(db, post.id) if post.counters_sharded else post
 
     return {
         "id": post.id,
@@ -254,9 +387,10 @@ def get_user_post(
         "tags": post.tags,
         "status": post.status,
         "published_at": post.published_at,
-        "view_count": post.view_count,
-        "likes_count": post.likes_count or 0,
-        "comments_count": post.comments_count or 0,
+        "view_count": (counts.view_count or 0) + view_buffer.pending_for(post.id),
+        "unique_views": counts.unique_views or 0,
+        "likes_count": counts.likes_count or 0,
+        "comments_count": counts.comments_count or 0,
         "github_repo_id": post.github_repo_id,
         "created_at": post.created_at,
         "author": {
@@ -276,47 +410,51 @@ def like_post(
     db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Like a post"""
-    post = db.query(BlogPost).filter(
-        BlogPost.id == post_id,
-        BlogPost.status == "published"
-    ).first()
-
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-
-    # Check if already liked
-    existing_like = db.query(PostLike).filter(
-        PostLike.user_id == current_user.id,
-        PostLike.post_id == post_id
+    """Like a post; liking it again returns the existing like"""
+    # Insert the like only if the post is published and not liked yet
+    like = db.execute(
+        insert(PostLike).from_select(
+            ["id", "user_id", "post_id"],
+            select(literal(str(uuid.uuid4())), literal(current_user.id), BlogPost.id).where(
+                BlogPost.id == post_id,
+                BlogPost.status == "published"
+            )
+        ).on_conflict_do_nothing(
+            index_elements=[PostLike.user_id, PostLike.post_id]
+        ).returning(PostLike.id, PostLike.user_id, PostLike.post_id, PostLike.created_at)
     ).first()
 
-    if existing_like:
-        raise HTTPException(status_code=400, detail="Already liked")
+    if like is None:
+        existing_like = db.query(PostLike).filter(
+            PostLike.user_id == current_user.id,
+            PostLike.post_id == post_id
+        ).first()
+        if not existing_like:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return existing_like
 
-    like = PostLike(
-        id=str(uuid.uuid4()),
-        user_id=current_user.id,
-        post_id=post_id
-    )
-    db.add(like)
+    # Add 1 to likes_count in SQL (or to a counter shard for hot posts)
+    counts = post_counters.add(db, post_id, likes_count=1)
 
-    # Update likes count
-    post.likes_count = (post.likes_count or 0) + 1
+    user_stats_service.bump_many(db, [
+        {"user_id": counts.user_id, "likes_received": 1},
+        {"user_id": current_user.id, "likes_given": 1},
+    ])
 
     # Create notification for post author
     create_notification(
         db=db,
-        user_id=post.user_id,
+        user_id=counts.user_id,
         actor_id=current_user.id,
         notification_type="like",
         post_id=post_id
     )
 
     db.commit()
-    db.refresh(like)
 
-    return like
+    feed_cache.invalidate_post(post_id, likes_count=counts.likes_count)
+
+    return dict(like._mapping)
 
 
 @router.delete("/posts/{post_id}/like")
@@ -325,26 +463,27 @@ def unlike_post(
     db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Unlike a post"""
-    post = db.query(BlogPost).filter(BlogPost.id == post_id).first()
-
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-
-    like = db.query(PostLike).filter(
-        PostLike.user_id == current_user.id,
-        PostLike.post_id == post_id
+    """Unlike a post; unliking a post that is not liked does nothing"""
+    like = db.execute(
+        delete(PostLike).where(
+            PostLike.user_id == current_user.id,
+            PostLike.post_id == post_id
+        ).returning(PostLike.id)
     ).first()
 
-    if not like:
-        raise HTTPException(status_code=400, detail="Not liked")
+    if like is None:
+        return {"status": "unliked"}
 
-    db.delete(like)
-
-    # Update likes count
-    post.likes_count = max((post.likes_count or 0) - 1, 0)
+    counts = post_counters.add(db, post_id, likes_count=-1)
+    retract_notification(db, counts.user_id, current_user.id, "like", post_id=post_id)
+    user_stats_service.bump_many(db, [
+        {"user_id": counts.user_id, "likes_received": -1},
+        {"user_id": current_user.id, "likes_given": -1},
+    ])
     db.commit()
 
+    feed_cache.invalidate_post(post_id, likes_count=counts.likes_count)
+
     return {"status": "unliked"}
 
 
@@ -363,6 +502,19 @@ def check_liked(
     return {"liked": like is not None}
 
 
+@router.post("/posts/liked-states", response_model=LikedStatesResponse)
+def get_liked_states(
+    data: LikedStatesRequest,
+    db: Session = Depends(get_db_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Check which of the given posts the current user liked, in one query"""
+    relationships = RelationshipResolver(db, current_user.id)
+    relationships.prefetch_likes(data.post_ids)
+
+    return {"liked": {post_id: relationships.has_liked(post_id) for post_id in data.post_ids}}
+
+
 # Follow endpoints
 @router.post("/users/{user_id}/follow", response_model=FollowResponse)
 def follow_user(
@@ -370,33 +522,38 @@ def follow_user(
     db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Follow a user"""
+    """Follow a user; following them again returns the existing follow"""
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
 
-    target_user = db.query(User).filter(
-        User.id == user_id,
-        User.is_active == True
+    # Insert the follow only if the user is active and not followed yet
+    follow = db.execute(
+        insert(Follow).from_select(
+            ["id", "follower_id", "following_id"],
+            select(literal(str(uuid.uuid4())), literal(current_user.id), User.id).where(
+                User.id == user_id,
+                User.is_active == True
+            )
+        ).on_conflict_do_nothing(
+            index_elements=[Follow.follower_id, Follow.following_id]
+        ).returning(Follow.id, Follow.follower_id, Follow.following_id, Follow.created_at)
     ).first()
 
-    if not target_user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Check if already following
-    existing_follow = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == user_id
-    ).first()
+    if follow is None:
+        existing_follow = db.query(Follow).filter(
+            Follow.follower_id == current_user.id,
+            Follow.following_id == user_id
+        ).first()
+        if not existing_follow:
+            raise HTTPException(status_code=404, detail="User not found")
+        return existing_follow
 
-    if existing_follow:
-        raise HTTPException(status_code=400, detail="Already following")
+    user_stats_service.bump_many(db, [
+        {"user_id": user_id, "followers_count": 1},
+        {"user_id": current_user.id, "following_count": 1},
+    ])
 
-    follow = Follow(
-        id=str(uuid.uuid4()),
-        follower_id=current_user.id,
-        following_id=user_id
-    )
-    db.add(follow)
+    timeline_service.backfill_follow(db, current_user.id, user_id)
 
     # Create notification for followed user
     create_notification(
@@ -407,9 +564,8 @@ def follow_user(
     )
 
     db.commit()
-    db.refresh(follow)
 
-    return follow
+    return dict(follow._mapping)
 
 
 @router.delete("/users/{user_id}/follow")
@@ -418,16 +574,23 @@ def unfollow_user(
     db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Unfollow a user"""
-    follow = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == user_id
+    """Unfollow a user; unfollowing someone not followed does nothing"""
+    follow = db.execute(
+        delete(Follow).where(
+            Follow.follower_id == current_user.id,
+            Follow.following_id == user_id
+        ).returning(Follow.id)
     ).first()
 
-    if not follow:
-        raise HTTPException(status_code=400, detail="Not following")
+    if follow is None:
+        return {"status": "unfollowed"}
 
-    db.delete(follow)
+    user_stats_service.bump_many(db, [
+        {"user_id": user_id, "followers_count": -1},
+        {"user_id": current_user.id, "following_count": -1},
+    ])
+    retract_notification(db, user_id, current_user.id, "follow")
+    timeline_service.remove_follow(db, current_user.id, user_id)
     db.commit()
 
     return {"status": "unfollowed"}
@@ -439,7 +602,7 @@ def get_followers(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db_session),
-    current_user: Optional[User] = Depends(get_current_user_optional)
+    current_user: Optional[Principal] = Depends(get_principal_optional)
 ):
     """Get user's followers"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -447,27 +610,24 @@ def get_followers(
         raise HTTPException(status_code=404, detail="User not found")
 
     offset = (page - 1) * limit
-    follows = db.query(Follow).filter(
+    follows = db.query(Follow).options(joinedload(Follow.follower)).filter(
         Follow.following_id == user_id
     ).offset(offset).limit(limit).all()
 
+    relationships = RelationshipResolver(db, current_user.id if current_user else None)
+    relationships.prefetch(follow.follower.id for follow in follows)
+
     result = []
     for follow in follows:
         follower = follow.follower
-        is_following = False
-        if current_user:
-            is_following = db.query(Follow).filter(
-                Follow.follower_id == current_user.id,
-                Follow.following_id == follower.id
-            ).first() is not None
-
         result.append({
             "id": follower.id,
             "username": follower.username,
             "github_username": follower.github_username,
             "avatar_url": follower.avatar_url,
             "bio": follower.bio,
-            "is_following": is_following
+            "is_following": relationships.is_following(follower.id),
+            "follows_you": relationships.follows_you(follower.id)
         })
 
     return result
@@ -479,7 +639,7 @@ def get_following(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db_session),
-    current_user: Optional[User] = Depends(get_current_user_optional)
+    current_user: Optional[Principal] = Depends(get_principal_optional)
 ):
     """Get users that this user is following"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -487,27 +647,24 @@ def get_following(
         raise HTTPException(status_code=404, detail="User not found")
 
     offset = (page - 1) * limit
-    follows = db.query(Follow).filter(
+    follows = db.query(Follow).options(joinedload(Follow.following)).filter(
         Follow.follower_id == user_id
     ).offset(offset).limit(limit).all()
 
+    relationships = RelationshipResolver(db, current_user.id if current_user else None)
+    relationships.prefetch(follow.following.id for follow in follows)
+
     result = []
     for follow in follows:
         following = follow.following
-        is_following = False
-        if current_user:
-            is_following = db.query(Follow).filter(
-                Follow.follower_id == current_user.id,
-                Follow.following_id == following.id
-            ).first() is not None
-
         result.append({
             "id": following.id,
             "username": following.username,
             "github_username": following.github_username,
             "avatar_url": following.avatar_url,
             "bio": following.bio,
-            "is_following": is_following
+            "is_following": relationships.is_following(following.id),
+            "follows_you": relationships.follows_you(following.id)
         })
 
     return result
@@ -525,6 +682,9 @@ def update_bio(
     db.commit()
     db.refresh(current_user)
 
+    # Author bio is embedded in cached feed cards
+    feed_cache.invalidate_author(current_user.id)
+
     return {"bio": current_user.bio}
 
 
@@ -544,7 +704,9 @@ def comment_to_response(comment: Comment) -> dict:
         "is_deleted": comment.is_deleted,
         "created_at": comment.created_at,
         "updated_at": comment.updated_at,
-        "replies": []
+        "replies": [],
+        "reply_count": 0,
+        "has_more_replies": False
     }
 
 
@@ -562,17 +724,113 @@ def build_comment_tree(comments: List[Comment]) -> List[dict]:
         if comment.parent_id is None:
             root_comments.append(comment_dict[comment.id])
         elif comment.parent_id in comment_dict:
-            comment_dict[comment.parent_id]["replies"].append(comment_dict[comment.id])
+            parent = comment_dict[comment.parent_id]
+            parent["replies"].append(comment_dict[comment.id])
+            parent["reply_count"] += 1
 
     return root_comments
 
 
-@router.get("/posts/{post_id}/comments", response_model=List[CommentResponse])
+def _visible_comments(post_id: str):
+    """
+    Filter for comments worth showing on post_id: live comments, plus deleted
+    ones that still have a live descendant. Deleted leaf subtrees are pruned.
+    """
+    live_ancestors = select(Comment.parent_id.label("id")).where(
+        Comment.post_id == post_id,
+        Comment.is_deleted.isnot(True),
+        Comment.parent_id.isnot(None)
+    ).cte("live_ancestors", recursive=True)
+    ancestor = aliased(Comment)
+    live_ancestors = live_ancestors.union(
+        select(ancestor.parent_id).join(live_ancestors, ancestor.id == live_ancestors.c.id).where(
+            ancestor.parent_id.isnot(None)
+        )
+    )
+    return or_(Comment.is_deleted.isnot(True), Comment.id.in_(select(live_ancestors.c.id)))
+
+
+def _comment_cursor_key(cursor: str) -> tuple:
+    """Decode a comment cursor into (created_at, id)"""
+    try:
+        mode, key = decode_cursor(cursor)
+        if mode != "comments" or len(key) != 2:
+            raise ValueError("Not a comment cursor")
+        return datetime.fromisoformat(key[0]), key[1]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _comment_page(db: Session, query, visible, cursor: Optional[str], limit: int, replies_per_comment: int) -> dict:
+    """
+    Keyset-paginate query in (created_at, id) order and attach up to
+    replies_per_comment direct replies to each comment. Authors come from the
+    same joined query as their comments, and reply counts from one GROUP BY.
+    """
+    if cursor:
+        query = query.filter(tuple_(Comment.created_at, Comment.id) > tuple_(*_comment_cursor_key(cursor)))
+
+    # Fetch one extra row to know whether another page exists
+    comments = query.options(joinedload(Comment.user)).order_by(
+        Comment.created_at.asc(), Comment.id.asc()
+    ).limit(limit + 1).all()
+    has_more = len(comments) > limit
+    comments = comments[:limit]
+    comment_ids = [c.id for c in comments]
+
+    replies: List[Comment] = []
+    if comment_ids and replies_per_comment > 0:
+        ranked = select(
+            Comment.id,
+            func.row_number().over(
+                partition_by=Comment.parent_id, order_by=(Comment.created_at, Comment.id)
+            ).label("position")
+        ).where(Comment.parent_id.in_(comment_ids), visible).subquery()
+        replies = db.query(Comment).options(joinedload(Comment.user)).join(
+            ranked, ranked.c.id == Comment.id
+        ).filter(
+            ranked.c.position <= replies_per_comment
+        ).order_by(Comment.created_at.asc(), Comment.id.asc()).all()
+
+    reply_counts = {}
+    if comment_ids:
+        reply_counts = dict(db.query(Comment.parent_id, func.count(Comment.id)).filter(
+            Comment.parent_id.in_(comment_ids + [r.id for r in replies]), visible
+        ).group_by(Comment.parent_id).all())
+
+    responses = {}
+    for comment in comments + replies:
+        response = comment_to_response(comment)
+        response["reply_count"] = reply_counts.get(comment.id, 0)
+        responses[comment.id] = response
+    for reply in replies:
+        responses[reply.parent_id]["replies"].append(responses[reply.id])
+    for response in responses.values():
+        response["has_more_replies"] = response["reply_count"] > len(response["replies"])
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor("comments", [comments[-1].created_at, comments[-1].id])
+
+    return {"comments": [responses[c.id] for c in comments], "next_cursor": next_cursor}
+
+
+@router.get("/posts/{post_id}/comments", response_model=Union[List[CommentResponse], CommentPage])
 def get_post_comments(
     post_id: str,
+    cursor: Optional[str] = Query(None, description="Opaque cursor; pass an empty value for the first page"),
+    limit: int = Query(20, ge=1, le=100),
+    replies_per_root: int = Query(3, ge=0, le=50),
     db: Session = Depends(get_db_session)
 ):
-    """Get all comments for a post"""
+    """
+    Get comments for a post
+
+    Without `cursor` the whole thread is returned as a tree (legacy mode).
+    With `cursor` (empty for the first page) root comments are keyset-paginated
+    and each carries up to `replies_per_root` replies; load the rest of a
+    subtree from /comments/{comment_id}/replies.
+    """
     post = db.query(BlogPost).filter(
         BlogPost.id == post_id,
         BlogPost.status == "published"
@@ -581,11 +839,43 @@ def get_post_comments(
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    comments = db.query(Comment).filter(
-        Comment.post_id == post_id
-    ).order_by(Comment.created_at.asc()).all()
+    visible = _visible_comments(post_id)
+
+    if cursor is None:
+        comments = db.query(Comment).options(joinedload(Comment.user)).filter(
+            Comment.post_id == post_id,
+            visible
+        ).order_by(Comment.created_at.asc(), Comment.id.asc()).all()
+        return build_comment_tree(comments)
 
-    return build_comment_tree(comments)
+    roots = db.query(Comment).filter(
+        Comment.post_id == post_id,
+        Comment.parent_id.is_(None),
+        visible
+    )
+    return _comment_page(db, roots, visible, cursor, limit, replies_per_root)
+
+
+@router.get("/comments/{comment_id}/replies", response_model=CommentPage)
+def get_comment_replies(
+    comment_id: str,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    replies_per_comment: int = Query(3, ge=0, le=50),
+    db: Session = Depends(get_db_session)
+):
+    """Get direct replies to a comment, each with up to `replies_per_comment` of its own replies"""
+    comment = db.query(Comment).join(BlogPost, Comment.post_id == BlogPost.id).filter(
+        Comment.id == comment_id,
+        BlogPost.status == "published"
+    ).first()
+
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    visible = _visible_comments(comment.post_id)
+    replies = db.query(Comment).filter(Comment.parent_id == comment_id, visible)
+    return _comment_page(db, replies, visible, cursor, limit, replies_per_comment)
 
 
 @router.post("/posts/{post_id}/comments", response_model=CommentResponse)
@@ -623,7 +913,8 @@ def create_comment(
     db.add(comment)
 
     # Update comments count
-    post.comments_count = (post.comments_count or 0) + 1
+    post_counters.add(db, post.id, comments_count=1)
+    user_stats_service.bump(db, post.user_id, comments_received=1)
 
     # Create notification
     if data.parent_id:
@@ -652,6 +943,8 @@ def create_comment(
     db.commit()
     db.refresh(comment)
 
+    feed_cache.invalidate_post(post_id)
+
     return comment_to_response(comment)
 
 
@@ -696,14 +989,21 @@ def delete_comment(
     if comment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
 
+    # Already deleted; counting it again would make comments_count drift
+    if comment.is_deleted:
+        return {"status": "deleted"}
+
     comment.is_deleted = True
     comment.content = ""
 
     # Update comments count
     post = db.query(BlogPost).filter(BlogPost.id == comment.post_id).first()
     if post:
-        post.comments_count = max((post.comments_count or 0) - 1, 0)
+        post_counters.add(db, post.id, comments_count=-1)
+        user_stats_service.bump(db, post.user_id, comments_received=-1)
 
     db.commit()
 
+    feed_cache.invalidate_post(comment.post_id)
+
     return {"status": "deleted"}
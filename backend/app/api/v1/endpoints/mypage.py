@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, cast, Date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import desc, func
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uuid
 
 from app.api.deps import get_db_session, get_current_user
-from app.models import User, BlogPost, PostLike, Follow, Comment, PostView
+from app.models import User, BlogPost, PostLike, Follow, Comment, UserDailyStats
 from app.schemas.social import (
     MyPageProfile,
     UserStats,
@@ -15,51 +15,37 @@ from app.schemas.social import (
     UserBioUpdate,
     FollowerUser
 )
-from app.schemas.blog import BlogPostPublic, AuthorPublic, DailyStats, StatsHistory
+from app.schemas.blog import BlogPostPublic, DailyStats, StatsHistory, StatsAnalytics
+from app.services.feed_cache import feed_cache
+from app.services.relationship_service import RelationshipResolver
+from app.services import user_stats_service, stats_analytics, post_counters
+from app.services.view_history import post_view_history
+from app.api.v1.endpoints.feed import with_viewer_state
+from app.services.post_queries import post_cards_select, card_to_public
 
 router = APIRouter()
 
 
+def _user_stats(db: Session, user_id: str) -> UserStats:
+    """Dashboard stats from the user_stats rollup (one primary-key lookup)"""
+    stats = user_stats_service.get_user_stats(db, user_id)
+    return UserStats(
+        total_posts=stats["posts_count"],
+        total_views=stats["views_count"],
+        total_likes_received=stats["likes_received"],
+        total_likes_given=stats["likes_given"],
+        followers_count=stats["followers_count"],
+        following_count=stats["following_count"]
+    )
+
+
 @router.get("/me", response_model=MyPageProfile)
 def get_my_page(
     db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get current user's my page profile with stats"""
-    # Calculate stats
-    total_posts = db.query(func.count(BlogPost.id)).filter(
-        BlogPost.user_id == current_user.id,
-        BlogPost.status == "published"
-    ).scalar()
-
-    total_views = db.query(func.coalesce(func.sum(BlogPost.view_count), 0)).filter(
-        BlogPost.user_id == current_user.id
-    ).scalar()
-
-    total_likes_received = db.query(func.coalesce(func.sum(BlogPost.likes_count), 0)).filter(
-        BlogPost.user_id == current_user.id
-    ).scalar()
-
-    total_likes_given = db.query(func.count(PostLike.id)).filter(
-        PostLike.user_id == current_user.id
-    ).scalar()
-
-    followers_count = db.query(func.count(Follow.id)).filter(
-        Follow.following_id == current_user.id
-    ).scalar()
-
-    following_count = db.query(func.count(Follow.id)).filter(
-        Follow.follower_id == current_user.id
-    ).scalar()
-
-    stats = UserStats(
-        total_posts=total_posts,
-        total_views=total_views,
-        total_likes_received=total_likes_received,
-        total_likes_given=total_likes_given,
-        followers_count=followers_count,
-        following_count=following_count
-    )
+    stats = _user_stats(db, current_user.id)
 
     # Parse social_links from JSONB
     social_links = None
@@ -90,6 +76,10 @@ def update_my_bio(
     current_user.bio = data.bio
     db.commit()
     db.refresh(current_user)
+
+    # Author bio is embedded in cached feed cards
+    feed_cache.invalidate_author(current_user.id)
+
     return {"bio": current_user.bio}
 
 
@@ -118,43 +108,19 @@ def get_my_posts(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user's posts"""
-    query = db.query(BlogPost).filter(BlogPost.user_id == current_user.id)
+    stmt = post_cards_select().where(BlogPost.user_id == current_user.id)
 
     if status == "published":
-        query = query.filter(BlogPost.status == "published")
+        stmt = stmt.where(BlogPost.status == "published")
     elif status == "draft":
-        query = query.filter(BlogPost.status == "draft")
+        stmt = stmt.where(BlogPost.status == "draft")
 
-    query = query.order_by(desc(BlogPost.updated_at))
+    stmt = stmt.order_by(desc(BlogPost.updated_at))
 
     offset = (page - 1) * limit
-    posts = query.offset(offset).limit(limit).all()
-
-    author = AuthorPublic(
-        id=current_user.id,
-        username=current_user.username,
-        github_username=current_user.github_username,
-        avatar_url=current_user.avatar_url,
-        bio=current_user.bio
-    )
+    rows = db.execute(stmt.offset(offset).limit(limit)).all()
 
-    return [
-        {
-            "id": post.id,
-            "title": post.title,
-            "slug": post.slug,
-            "excerpt": post.excerpt,
-            "cover_image": post.cover_image,
-            "tags": post.tags,
-            "status": post.status,
-            "published_at": post.published_at,
-            "view_count": post.view_count,
-            "likes_count": post.likes_count or 0,
-            "created_at": post.created_at,
-            "author": author
-        }
-        for post in posts
-    ]
+    return [card_to_public(row) for row in rows]
 
 
 @router.get("/me/liked-posts", response_model=List[BlogPostPublic])
@@ -165,39 +131,17 @@ def get_my_liked_posts(
     current_user: User = Depends(get_current_user)
 ):
     """Get posts liked by current user"""
-    query = db.query(BlogPost).join(PostLike).join(
-        User, BlogPost.user_id == User.id
-    ).filter(
+    stmt = post_cards_select().join(PostLike, PostLike.post_id == BlogPost.id).where(
         PostLike.user_id == current_user.id,
         BlogPost.status == "published"
     ).order_by(desc(PostLike.created_at))
 
     offset = (page - 1) * limit
-    posts = query.offset(offset).limit(limit).all()
-
-    return [
-        {
-            "id": post.id,
-            "title": post.title,
-            "slug": post.slug,
-            "excerpt": post.excerpt,
-            "cover_image": post.cover_image,
-            "tags": post.tags,
-            "status": post.status,
-            "published_at": post.published_at,
-            "view_count": post.view_count,
-            "likes_count": post.likes_count or 0,
-            "created_at": post.created_at,
-            "author": {
-                "id": post.user.id,
-                "username": post.user.username,
-                "github_username": post.user.github_username,
-                "avatar_url": post.user.avatar_url,
-                "bio": post.user.bio
-            }
-        }
-        for post in posts
-    ]
+    rows = db.execute(stmt.offset(offset).limit(limit)).all()
+
+    result = [card_to_public(row) for row in rows]
+
+    return with_viewer_state(result, RelationshipResolver(db, current_user.id))
 
 
 @router.get("/me/followers", response_model=List[FollowerUser])
@@ -209,26 +153,25 @@ def get_my_followers(
 ):
     """Get current user's followers"""
     offset = (page - 1) * limit
-    follows = db.query(Follow).filter(
+    follows = db.query(Follow).options(joinedload(Follow.follower)).filter(
         Follow.following_id == current_user.id
     ).order_by(desc(Follow.created_at)).offset(offset).limit(limit).all()
 
+    # Check which followers the current user follows back, in one query
+    relationships = RelationshipResolver(db, current_user.id)
+    relationships.prefetch(follow.follower_id for follow in follows)
+
     result = []
     for follow in follows:
         follower = follow.follower
-        # Check if current user follows back
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == follower.id
-        ).first() is not None
-
         result.append({
             "id": follower.id,
             "username": follower.username,
             "github_username": follower.github_username,
             "avatar_url": follower.avatar_url,
             "bio": follower.bio,
-            "is_following": is_following
+            "is_following": relationships.is_following(follower.id),
+            "follows_you": True  # Every row in the followers list follows the current user
         })
 
     return result
@@ -243,10 +186,13 @@ def get_my_following(
 ):
     """Get users that current user is following"""
     offset = (page - 1) * limit
-    follows = db.query(Follow).filter(
+    follows = db.query(Follow).options(joinedload(Follow.following)).filter(
         Follow.follower_id == current_user.id
     ).order_by(desc(Follow.created_at)).offset(offset).limit(limit).all()
 
+    relationships = RelationshipResolver(db, current_user.id)
+    relationships.prefetch(follow.following_id for follow in follows)
+
     result = []
     for follow in follows:
         following = follow.following
@@ -256,7 +202,8 @@ def get_my_following(
             "github_username": following.github_username,
             "avatar_url": following.avatar_url,
             "bio": following.bio,
-            "is_following": True  # Obviously following since this is the following list
+            "is_following": True,  # Obviously following since this is the following list
+            "follows_you": relationships.follows_you(following.id)
         })
 
     return result
@@ -268,133 +215,118 @@ def get_my_stats(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user's statistics"""
-    total_posts = db.query(func.count(BlogPost.id)).filter(
-        BlogPost.user_id == current_user.id,
-        BlogPost.status == "published"
-    ).scalar()
-
-    total_views = db.query(func.coalesce(func.sum(BlogPost.view_count), 0)).filter(
-        BlogPost.user_id == current_user.id
-    ).scalar()
-
-    total_likes_received = db.query(func.coalesce(func.sum(BlogPost.likes_count), 0)).filter(
-        BlogPost.user_id == current_user.id
-    ).scalar()
-
-    total_likes_given = db.query(func.count(PostLike.id)).filter(
-        PostLike.user_id == current_user.id
-    ).scalar()
-
-    followers_count = db.query(func.count(Follow.id)).filter(
-        Follow.following_id == current_user.id
-    ).scalar()
-
-    following_count = db.query(func.count(Follow.id)).filter(
-        Follow.follower_id == current_user.id
-    ).scalar()
-
-    return UserStats(
-        total_posts=total_posts,
-        total_views=total_views,
-        total_likes_received=total_likes_received,
-        total_likes_given=total_likes_given,
-        followers_count=followers_count,
-        following_count=following_count
-    )
+    return _user_stats(db, current_user.id)
 
 
 @router.get("/me/stats/history", response_model=StatsHistory)
 def get_my_stats_history(
-    days: int = 30,
+    days: int = Query(30, ge=1, le=730),
+    analytics: bool = False,
     db: Session = Depends(get_db_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's stats history for charts (likes and comments received on my posts by date)"""
-    # Limit days to prevent abuse
-    days = min(days, 90)
-
-    # Get all user's post IDs
-    user_post_ids = db.query(BlogPost.id).filter(
-        BlogPost.user_id == current_user.id
-    ).all()
-    post_ids = [p.id for p in user_post_ids]
-
+    """
+    Get user's stats history for charts (views, likes, comments and new
+    followers by date), read from the user_daily_stats rollup.
+    With analytics, also return moving averages, growth over the previous
+    period and per-post percentile ranks.
+    """
     # Calculate date range
-    end_date = datetime.now().date()
+    end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=days - 1)
-
-    # Get views by date on user's posts
-    views_by_date = {}
-    if post_ids:
-        views_query = db.query(
-            cast(PostView.view_date, Date).label('date'),
-            func.sum(PostView.view_count).label('count')
-        ).filter(
-            PostView.post_id.in_(post_ids),
-            cast(PostView.view_date, Date) >= start_date
-        ).group_by(cast(PostView.view_date, Date)).all()
-
-        for row in views_query:
-            views_by_date[str(row.date)] = row.count or 0
-
-    # Get likes by date on user's posts
-    likes_by_date = {}
-    if post_ids:
-        likes_query = db.query(
-            cast(PostLike.created_at, Date).label('date'),
-            func.count(PostLike.id).label('count')
-        ).filter(
-            PostLike.post_id.in_(post_ids),
-            cast(PostLike.created_at, Date) >= start_date
-        ).group_by(cast(PostLike.created_at, Date)).all()
-
-        for row in likes_query:
-            likes_by_date[str(row.date)] = row.count
-
-    # Get comments by date on user's posts
-    comments_by_date = {}
-    if post_ids:
-        comments_query = db.query(
-            cast(Comment.created_at, Date).label('date'),
-            func.count(Comment.id).label('count')
-        ).filter(
-            Comment.post_id.in_(post_ids),
-            Comment.is_deleted == False,
-            cast(Comment.created_at, Date) >= start_date
-        ).group_by(cast(Comment.created_at, Date)).all()
-
-        for row in comments_query:
-            comments_by_date[str(row.date)] = row.count
+    # Analytics also need the days before the range
+    first_date = start_date - timedelta(days=stats_analytics.lookback_days(days)) if analytics else start_date
+
+    # One primary-key range scan over (user_id, date)
+    stored = db.query(UserDailyStats).filter(
+        UserDailyStats.user_id == current_user.id,
+        UserDailyStats.date >= first_date,
+        UserDailyStats.date <= end_date
+    ).all()
+    rows = {row.date: row for row in stored}
 
     # Build daily stats for all days in range
     daily_stats = []
     current_date = start_date
     while current_date <= end_date:
-        date_str = str(current_date)
+        row = rows.get(current_date)
         daily_stats.append(DailyStats(
-            date=date_str,
-            views=views_by_date.get(date_str, 0),
-            likes=likes_by_date.get(date_str, 0),
-            comments=comments_by_date.get(date_str, 0)
+            date=str(current_date),
+            views=row.views if row else 0,
+            unique_views=row.unique_views if row else 0,
+            likes=row.likes if row else 0,
+            comments=row.comments if row else 0,
+            follows=row.follows if row else 0
         ))
         current_date += timedelta(days=1)
 
     # Get totals
-    total_views = db.query(func.coalesce(func.sum(BlogPost.view_count), 0)).filter(
-        BlogPost.user_id == current_user.id
-    ).scalar()
+    totals = user_stats_service.get_user_stats(db, current_user.id)
 
-    total_likes = db.query(func.coalesce(func.sum(BlogPost.likes_count), 0)).filter(
-        BlogPost.user_id == current_user.id
-    ).scalar()
+    return StatsHistory(
+        daily_stats=daily_stats,
+        total_views=totals["views_count"],
+        total_unique_views=totals["unique_views_count"],
+        total_likes=totals["likes_received"],
+        total_comments=totals["comments_received"],
+        analytics=StatsAnalytics(
+            metrics=stats_analytics.series_analytics(stored, first_date, start_date, end_date),
+            posts=stats_analytics.post_percentiles(db, current_user.id, start_date, end_date)
+        ) if analytics else None
+    )
 
-    total_comments = db.query(func.coalesce(func.sum(BlogPost.comments_count), 0)).filter(
+
+@router.get("/me/posts/{post_id}/stats/history", response_model=StatsHistory)
+def get_my_post_stats_history(
+    post_id: str,
+    days: int = Query(30, ge=1, le=730),
+    db: Session = Depends(get_db_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get one of the user's posts' stats history for charts; views are sliced
+    from the post's monthly post_views arrays
+    """
+    post = db.query(BlogPost).filter(
+        BlogPost.id == post_id,
         BlogPost.user_id == current_user.id
-    ).scalar()
+    ).first()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    end_date = datetime.utcnow().date()
+    start_date = end_date - timedelta(days=days - 1)
+    since = datetime.combine(start_date, datetime.min.time())
+
+    views = post_view_history(db, post.id, start_date, end_date)
+    likes = dict(db.query(func.date(PostLike.created_at), func.count()).filter(
+        PostLike.post_id == post.id,
+        PostLike.created_at >= since
+    ).group_by(func.date(PostLike.created_at)).all())
+    comments = dict(db.query(func.date(Comment.created_at), func.count()).filter(
+        Comment.post_id == post.id,
+        Comment.created_at >= since,
+        Comment.is_deleted == False
+    ).group_by(func.date(Comment.created_at)).all())
+
+    daily_stats = []
+    current_date = start_date
+    while current_date <= end_date:
+        day_views, day_unique = views.get(current_date, (0, 0))
+        daily_stats.append(DailyStats(
+            date=str(current_date),
+            views=day_views,
+            unique_views=day_unique,
+            likes=likes.get(current_date, 0),
+            comments=comments.get(current_date, 0)
+        ))
+        current_date += timedelta(days=1)
 
+    counts = post_counters.totals(db, post.id) if post.counters_sharded else post
     return StatsHistory(
         daily_stats=daily_stats,
-        total_views=total_views,
-        total_likes=total_likes,
-        total_comments=total_comments
+        total_views=counts.view_count or 0,
+        total_unique_views=counts.unique_views or 0,
+        total_likes=counts.likes_count or 0,
+        total_comments=counts.comments_count or 0
     )
@@ -1,34 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, desc, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
 import uuid
 
-from app.api.deps import get_db_session, get_current_user
-from app.models import User, Notification, BlogPost, Comment, Follow
+from app.api.deps import get_db_session, get_current_user, optional_security, principal_from_token
+from app.core.config import settings
+from app.models import User, Notification, NotificationActor, BlogPost
+from app.models.base import SessionLocal
+from app.services.notification_bus import notification_bus
+from app.services.principal_cache import Principal
+from app.services.relationship_service import RelationshipResolver
 from app.schemas.notification import (
     NotificationResponse,
     NotificationList,
-    NotificationActor,
-    NotificationPost,
-    NotificationComment,
     MarkReadRequest
 )
 
 router = APIRouter()
 
+# Everything notification_to_response reads, joined into the notification query
+NOTIFICATION_LOAD_OPTIONS = (
+    joinedload(Notification.actor),
+    joinedload(Notification.post).joinedload(BlogPost.user),
+    joinedload(Notification.comment),
+)
+
 
-def notification_to_response(notification: Notification, db: Session, current_user_id: str) -> dict:
+def notification_to_response(notification: Notification, relationships: RelationshipResolver) -> dict:
     """Convert notification to response dict"""
     actor = notification.actor
     post = notification.post
     comment = notification.comment
 
     # Check if current user is following the actor
-    is_following = db.query(Follow).filter(
-        Follow.follower_id == current_user_id,
-        Follow.following_id == actor.id
-    ).first() is not None
+    is_following = relationships.is_following(actor.id)
 
     result = {
         "id": notification.id,
@@ -40,6 +51,8 @@ def notification_to_response(notification: Notification, db: Session, current_us
             "avatar_url": actor.avatar_url,
             "is_following": is_following,
         },
+        "actor_count": notification.actor_count or 1,
+        "sample_actor_ids": _sample_actors(notification),
         "post": None,
         "comment": None,
         "is_read": notification.is_read,
@@ -82,19 +95,21 @@ def get_notifications(
     if unread_only:
         query = query.filter(Notification.is_read == False)
 
-    # Get total and unread counts
-    total_count = query.count()
-    unread_count = db.query(func.count(Notification.id)).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).scalar()
+    # Unread count is denormalized on the user; total is only counted when it differs
+    unread_count = current_user.unread_notifications or 0
+    total_count = unread_count if unread_only else query.count()
 
     # Paginate and order
     offset = (page - 1) * limit
-    notifications = query.order_by(desc(Notification.created_at)).offset(offset).limit(limit).all()
+    notifications = query.options(*NOTIFICATION_LOAD_OPTIONS).order_by(
+        desc(Notification.created_at)
+    ).offset(offset).limit(limit).all()
+
+    relationships = RelationshipResolver(db, current_user.id)
+    relationships.prefetch(n.actor_id for n in notifications)
 
     return {
-        "notifications": [notification_to_response(n, db, current_user.id) for n in notifications],
+        "notifications": [notification_to_response(n, relationships) for n in notifications],
         "unread_count": unread_count,
         "total_count": total_count,
     }
@@ -102,16 +117,184 @@ def get_notifications(
 
 @router.get("/unread-count")
 def get_unread_count(
-    db: Session = Depends(get_db_session),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    """Get count of unread notifications"""
-    count = db.query(func.count(Notification.id)).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).scalar()
+    """
+    Get count of unread notifications
+
+    The ETag is the user's notifications_version; send it back in
+    If-None-Match to get 304 Not Modified while nothing has changed.
+    """
+    etag = f'"{current_user.notifications_version or 0}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return {"count": current_user.unread_notifications or 0, "version": current_user.notifications_version or 0}
+
+
+# Server-push streams
+StreamPosition = Tuple[datetime, str]  # (created_at, id) of the last notification sent
+
+
+def _authenticate_stream(token: Optional[str]) -> Optional[Principal]:
+    """Resolve a stream's bearer token to the principal of an existing user, as get_current_user does"""
+    principal = principal_from_token(token) if token else None
+    if principal is None or not _principal_valid(principal):
+        return None
+    return principal
+
+
+def _principal_valid(principal: Principal) -> bool:
+    """Whether the user still exists and the principal's token version has not been revoked"""
+    db = SessionLocal()
+    try:
+        return principal.resolve(db) is not None
+    finally:
+        db.close()
+
 
-    return {"count": count}
+def _stream_position(user_id: str, last_event_id: Optional[str]) -> StreamPosition:
+    """
+    Where a stream starts: after last_event_id when resuming, otherwise after
+    the user's newest notification so only new ones are pushed
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Notification.created_at, Notification.id).filter(Notification.user_id == user_id)
+        row = None
+        if last_event_id:
+            row = query.filter(Notification.id == last_event_id).first()
+        if row is None:
+            row = query.order_by(desc(Notification.created_at), desc(Notification.id)).first()
+        return (row.created_at, row.id) if row else (datetime.min, "")
+    finally:
+        db.close()
+
+
+def _notifications_after(user_id: str, position: StreamPosition) -> List[Tuple[StreamPosition, str]]:
+    """Serialize the user's notifications created after position, oldest first"""
+    db = SessionLocal()
+    try:
+        notifications = db.query(Notification).options(*NOTIFICATION_LOAD_OPTIONS).filter(
+            Notification.user_id == user_id,
+            tuple_(Notification.created_at, Notification.id) > tuple_(*position)
+        ).order_by(
+            Notification.created_at.asc(), Notification.id.asc()
+        ).limit(settings.NOTIFICATION_STREAM_BATCH_SIZE).all()
+
+        relationships = RelationshipResolver(db, user_id)
+        relationships.prefetch(n.actor_id for n in notifications)
+
+        return [
+            (
+                (n.created_at, n.id),
+                NotificationResponse.model_validate(notification_to_response(n, relationships)).model_dump_json()
+            )
+            for n in notifications
+        ]
+    finally:
+        db.close()
+
+
+async def _stream_events(principal: Principal, last_event_id: Optional[str]):
+    """
+    Yield (event_id, json) for each new notification, or None as a heartbeat
+    after NOTIFICATION_STREAM_HEARTBEAT_SECONDS without one. Ends when the
+    principal's token is revoked (checked at each heartbeat).
+    """
+    user_id = principal.id
+    # Subscribe before reading the position so nothing created in between is missed
+    subscription = notification_bus.subscribe(user_id)
+    try:
+        position = await run_in_threadpool(_stream_position, user_id, last_event_id)
+        pending = bool(last_event_id)
+        while True:
+            if pending:
+                events = await run_in_threadpool(_notifications_after, user_id, position)
+                for position, data in events:
+                    yield position[1], data
+                # A full batch means there may be more to catch up on
+                pending = len(events) == settings.NOTIFICATION_STREAM_BATCH_SIZE
+                if pending:
+                    continue
+            pending = await subscription.wait(settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS)
+            if not pending:
+                if not await run_in_threadpool(_principal_valid, principal):
+                    return
+                yield None
+    finally:
+        notification_bus.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    access_token: Optional[str] = Query(None, description="For EventSource clients, which cannot set headers"),
+    last_event_id: Optional[str] = Header(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """
+    Server-Sent Events stream of new notifications
+
+    Each `notification` event carries a NotificationResponse and the
+    notification id as its event id; reconnecting with Last-Event-ID replays
+    anything missed. Comment lines are sent as heartbeats.
+    """
+    token = credentials.credentials if credentials else access_token
+    principal = await run_in_threadpool(_authenticate_stream, token)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+
+    async def event_source():
+        retry_ms = int(settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS * 1000)
+        yield f"retry: {retry_ms}\n\n"
+        async for event in _stream_events(principal, last_event_id):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": heartbeat\n\n"
+            else:
+                event_id, data = event
+                yield f"id: {event_id}\nevent: notification\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def notifications_websocket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Query(None)
+):
+    """
+    WebSocket variant of /stream
+
+    Messages are {"type": "notification", "id", "data"} or {"type": "heartbeat"}.
+    """
+    principal = await run_in_threadpool(_authenticate_stream, token)
+    if principal is None:
+        await websocket.close(code=4401)
+        return
+
+    await websocket.accept()
+    try:
+        async for event in _stream_events(principal, last_event_id):
+            if event is None:
+                await websocket.send_json({"type": "heartbeat"})
+            else:
+                event_id, data = event
+                await websocket.send_text(f'{{"type": "notification", "id": "{event_id}", "data": {data}}}')
+        # The token was revoked
+        await websocket.close(code=4401)
+    except WebSocketDisconnect:
+        pass
 
 
 @router.post("/mark-read")
@@ -128,7 +311,9 @@ def mark_notifications_read(
     if data.notification_ids:
         query = query.filter(Notification.id.in_(data.notification_ids))
 
-    query.update({"is_read": True}, synchronize_session=False)
+    marked = query.filter(Notification.is_read == False).update({"is_read": True}, synchronize_session=False)
+    if marked:
+        _bump_notification_state(db, current_user.id, -marked)
     db.commit()
 
     return {"status": "success"}
@@ -149,12 +334,65 @@ def delete_notification(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
 
+    _bump_notification_state(db, current_user.id, 0 if notification.is_read else -1)
+    _forget_actors(db, notification.id)
     db.delete(notification)
     db.commit()
 
     return {"status": "deleted"}
 
 
+def _bump_notification_state(db: Session, user_id: str, unread_delta: int) -> None:
+    """Adjust the user's unread counter and bump notifications_version, in the caller's transaction"""
+    db.query(User).filter(User.id == user_id).update({
+        User.unread_notifications: func.greatest(func.coalesce(User.unread_notifications, 0) + unread_delta, 0),
+        User.notifications_version: func.coalesce(User.notifications_version, 0) + 1,
+    }, synchronize_session=False)
+
+
+def discard_notifications(db: Session, *criteria) -> None:
+    """
+    Update recipients' counters for notifications about to be removed by a
+    cascading delete (a post or an actor account) or by retention. Call
+    before the delete. One UPDATE for all recipients.
+    """
+    removed = select(
+        Notification.user_id,
+        func.count(Notification.id).filter(Notification.is_read == False).label("unread")
+    ).where(*criteria).group_by(Notification.user_id).subquery()
+
+    db.execute(
+        update(User).where(User.id == removed.c.user_id).values(
+            unread_notifications=func.greatest(func.coalesce(User.unread_notifications, 0) - removed.c.unread, 0),
+            notifications_version=func.coalesce(User.notifications_version, 0) + 1,
+        ).execution_options(synchronize_session=False)
+    )
+
+
+# Like, follow and comment notifications on the same target are merged into one
+# unread row ("alice and 41 others liked your post"). Replies stay separate so
+# each can be answered inline.
+COALESCED_TYPES = {"like", "follow", "comment"}
+
+
+def _open_group(db: Session, user_id: str, notification_type: str, post_id: Optional[str]):
+    """Latest unread group for the target, locked for update"""
+    return db.query(Notification).filter(
+        Notification.user_id == user_id,
+        Notification.type == notification_type,
+        Notification.post_id == post_id,
+        Notification.is_read == False
+    ).order_by(desc(Notification.created_at)).with_for_update()
+
+
+def _sample_actors(notification: Notification) -> List[str]:
+    return list(notification.sample_actor_ids or [notification.actor_id])
+
+
+def _forget_actors(db: Session, notification_id: str) -> None:
+    db.execute(delete(NotificationActor).where(NotificationActor.notification_id == notification_id))
+
+
 # Helper function to create notifications (used by other endpoints)
 def create_notification(
     db: Session,
@@ -164,11 +402,50 @@ def create_notification(
     post_id: Optional[str] = None,
     comment_id: Optional[str] = None
 ):
-    """Create a new notification"""
+    """
+    Create a new notification, or merge it into the recipient's unread group
+    for the same type and target if that was active within the coalesce window
+    """
     # Don't create notification if user is notifying themselves
     if user_id == actor_id:
         return None
 
+    if notification_type in COALESCED_TYPES:
+        window = timedelta(hours=settings.NOTIFICATION_COALESCE_WINDOW_HOURS)
+        group = _open_group(db, user_id, notification_type, post_id).filter(
+            Notification.created_at >= func.now() - window
+        ).first()
+
+        if group is not None:
+            # Only an actor new to the group adds to its count, even once it
+            # has dropped out of the sample
+            added = db.execute(
+                insert(NotificationActor).values(
+                    notification_id=group.id, actor_id=actor_id
+                ).on_conflict_do_nothing().returning(NotificationActor.actor_id)
+            ).first()
+            if added is not None:
+                group.actor_count = (group.actor_count or 1) + 1
+            else:
+                db.execute(
+                    update(NotificationActor).where(
+                        NotificationActor.notification_id == group.id,
+                        NotificationActor.actor_id == actor_id
+                    ).values(created_at=func.now())
+                )
+
+            sample = _sample_actors(group)
+            if actor_id in sample:
+                sample.remove(actor_id)
+            group.sample_actor_ids = [actor_id] + sample[:settings.NOTIFICATION_SAMPLE_ACTORS - 1]
+            group.actor_id = actor_id
+            group.comment_id = comment_id
+            # Latest activity moves the group back to the top
+            group.created_at = func.now()
+            _bump_notification_state(db, user_id, 0)
+            notification_bus.publish(db, user_id, group.id)
+            return group
+
     notification = Notification(
         id=str(uuid.uuid4()),
         user_id=user_id,
@@ -176,6 +453,59 @@ def create_notification(
         type=notification_type,
         post_id=post_id,
         comment_id=comment_id,
+        actor_count=1,
+        sample_actor_ids=[actor_id],
     )
     db.add(notification)
+    if notification_type in COALESCED_TYPES:
+        db.execute(insert(NotificationActor).values(notification_id=notification.id, actor_id=actor_id))
+    _bump_notification_state(db, user_id, 1)
+    # Streams are woken once the caller commits
+    notification_bus.publish(db, user_id, notification.id)
     return notification
+
+
+def retract_notification(
+    db: Session,
+    user_id: str,  # Recipient
+    actor_id: str,
+    notification_type: str,
+    post_id: Optional[str] = None
+) -> None:
+    """Take actor_id back out of the unread group (unlike, unfollow); drops the group when it empties"""
+    if user_id == actor_id:
+        return
+
+    group = _open_group(db, user_id, notification_type, post_id).first()
+    if group is None:
+        return
+
+    removed = db.execute(
+        delete(NotificationActor).where(
+            NotificationActor.notification_id == group.id,
+            NotificationActor.actor_id == actor_id
+        ).returning(NotificationActor.actor_id)
+    ).first()
+    if removed is None:
+        return  # Not one of this group's actors
+
+    actor_count = group.actor_count or 1
+    if actor_count <= 1:
+        _bump_notification_state(db, user_id, -1)
+        _forget_actors(db, group.id)
+        db.delete(group)
+        return
+
+    sample = [sampled for sampled in _sample_actors(group) if sampled != actor_id]
+    if len(sample) < min(actor_count - 1, settings.NOTIFICATION_SAMPLE_ACTORS):
+        # Refill the sample from the group's remaining actors, latest first
+        sample = [
+            row.actor_id for row in db.query(NotificationActor.actor_id).filter(
+                NotificationActor.notification_id == group.id
+            ).order_by(desc(NotificationActor.created_at)).limit(settings.NOTIFICATION_SAMPLE_ACTORS).all()
+        ] or sample
+    group.actor_count = actor_count - 1
+    group.sample_actor_ids = sample
+    if group.actor_id == actor_id and sample:
+        group.actor_id = sample[0]
+    _bump_notification_state(db, user_id, 0)
@@ -4,7 +4,8 @@ from typing import List
 from datetime import datetime
 import uuid
 from app.api.deps import get_db_session
-from app.models import User
+from app.models import User, Notification
+from app.api.v1.endpoints.notifications import discard_notifications
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
 
 router = APIRouter()
@@ -120,6 +121,7 @@ def delete_user(user_id: str, db: Session = Depends(get_db_session)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    discard_notifications(db, Notification.actor_id == user.id)
     db.delete(user)
     db.commit()
 
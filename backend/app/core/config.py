@@ -22,6 +22,62 @@ class Settings(BaseSettings):
 
     OPENAI_API_KEY: str = ""
 
+    # Trending feed scoring
+    TRENDING_WINDOW_DAYS: int = 7
+    TRENDING_HALF_LIFE_HOURS: float = 24.0
+    TRENDING_VIEW_WEIGHT: float = 1.0
+    TRENDING_LIKE_WEIGHT: float = 5.0
+    TRENDING_REFRESH_OVERLAP_SECONDS: float = 300.0  # Activity committed late is still picked up
+
+    # Public feed first-pages cache
+    FEED_CACHE_SIZE: int = 60  # posts per sort mode (3 pages of 20)
+    FEED_CACHE_TTL_SECONDS: int = 300
+
+    # Home timeline fan-out
+    TIMELINE_MAX_LENGTH: int = 800
+    TIMELINE_FANOUT_CHUNK_SIZE: int = 1000
+    TIMELINE_FANOUT_MAX_FOLLOWERS: int = 10000  # Above this, authors are merged on read
+    TIMELINE_FOLLOW_BACKFILL: int = 20
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Queued or running; more are rejected with 503
+    PASSWORD_REHASH_ON_LOGIN: bool = True  # Rehash passwords stored with another BCRYPT_ROUNDS
+
+    # Authenticated user cache
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_SIZE: int = 10000
+
+    # Post view counting
+    VIEW_BUFFER_FLUSH_SECONDS: float = 5.0
+
+    # Sharded counters for hot posts
+    POST_COUNTER_SHARDS: int = 16
+    POST_COUNTER_PROMOTE_WRITES_PER_MINUTE: int = 120  # Per worker; above this a post is sharded
+    POST_COUNTER_DEMOTE_WRITES: int = 20  # Fewer writes between two compactions returns a post to plain counters
+
+    # Notification streams
+    NOTIFICATION_BUS: str = "memory"  # memory (single worker) or postgres (LISTEN/NOTIFY)
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    NOTIFICATION_STREAM_BATCH_SIZE: int = 50
+
+    # Notification grouping
+    NOTIFICATION_COALESCE_WINDOW_HOURS: float = 24.0  # Merge into an unread group active this recently
+    NOTIFICATION_SAMPLE_ACTORS: int = 5
+
+    # Notification retention (monthly partitions)
+    NOTIFICATION_RETENTION_DAYS: int = 180
+    NOTIFICATION_RETENTION_MODE: str = "archive"  # archive (keep detached tables) or drop
+    NOTIFICATION_PARTITIONS_AHEAD: int = 3
+
+    # "New post" notification fan-out
+    NOTIFICATION_FANOUT_CHUNK_SIZE: int = 1000
+    NOTIFICATION_FANOUT_POLL_SECONDS: float = 2.0
+    NOTIFICATION_FANOUT_MIN_CHUNK_DELAY_SECONDS: float = 0.05
+    NOTIFICATION_FANOUT_MAX_ATTEMPTS: int = 5  # Failed chunks in a row before a job is marked failed
+    NOTIFICATION_FANOUT_MAX_POSTS_PER_DAY: int = 5  # Per author; later posts are not announced
+
     @property
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
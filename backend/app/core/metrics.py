@@ -0,0 +1,68 @@
+"""
+Lightweight in-process metrics registry.
+
+Counters, timings and callable gauges are kept per worker process and
+exposed as JSON at /metrics.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._timings: Dict[str, dict] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a duration sample"""
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+            timing["last"] = seconds
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block and record it under `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def register_gauge(self, name: str, fn: Callable[[], float]) -> None:
+        """Register a callable evaluated each time metrics are read"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {
+                name: {**t, "avg": t["total"] / t["count"] if t["count"] else 0.0}
+                for name, t in self._timings.items()
+            }
+            gauges = dict(self._gauges)
+
+        return {
+            "counters": counters,
+            "timings": timings,
+            "gauges": {name: fn() for name, fn in gauges.items()},
+        }
+
+
+metrics = Metrics()
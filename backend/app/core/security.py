@@ -1,14 +1,26 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import metrics
 
 SECRET_KEY = settings.SECRET_KEY if hasattr(settings, 'SECRET_KEY') else "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with any other cost are flagged for rehashing on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -22,6 +34,65 @@ def get_password_hash(password: str) -> str:
     """
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are queued; the caller should retry later"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated bounded thread pool so async endpoints never
+    hash on the event loop. bcrypt releases the GIL while hashing, so
+    threads hash in parallel. Calls beyond max_pending queued or running
+    hashes are rejected with PasswordHasherBusy instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def queue_depth(self) -> int:
+        """Hashes queued or running"""
+        with self._lock:
+            return self._pending
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.incr("password_hasher.rejected")
+                raise PasswordHasherBusy()
+            self._pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+            metrics.observe("password_hasher.seconds", time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password; also returns a new hash when the stored one uses
+        another cost and PASSWORD_REHASH_ON_LOGIN is set
+        """
+        if not settings.PASSWORD_REHASH_ON_LOGIN:
+            return await self.verify(password, hashed_password), None
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+metrics.register_gauge("password_hasher.queue_depth", password_hasher.queue_depth)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
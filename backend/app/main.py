@@ -1,7 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.core.metrics import metrics
+from app.core.security import PasswordHasherBusy
+from app.services.view_buffer import view_buffer
+from app.services.notification_bus import notification_bus
+from app.services.notification_fanout import fanout_worker
 
 app = FastAPI(title=settings.PROJECT_NAME, version=settings.API_VERSION)
 
@@ -15,6 +21,27 @@ app.add_middleware(
 
 app.include_router(api_router, prefix=f"/api/{settings.API_VERSION}")
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.on_event("startup")
+def start_background_workers():
+    view_buffer.start()
+    notification_bus.start()
+    fanout_worker.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    # Flushes any views still buffered in this worker
+    view_buffer.stop()
+    fanout_worker.stop()
+    notification_bus.stop()
+
 @app.get("/")
 async def root():
     return {"message": f"{settings.PROJECT_NAME} API", "version": settings.API_VERSION}
@@ -22,3 +49,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
@@ -13,7 +13,15 @@ from app.models.models import (
     PostLike,
     Comment,
     Notification,
-    PostView
+    NotificationActor,
+    PostView,
+    PostViewSketch,
+    PostCounterShard,
+    PostTrendingScore,
+    TimelineEntry,
+    NotificationFanoutJob,
+    UserStatsRollup,
+    UserDailyStats
 )
 
 __all__ = [
@@ -33,5 +41,13 @@ __all__ = [
     "PostLike",
     "Comment",
     "Notification",
-    "PostView"
+    "NotificationActor",
+    "PostView",
+    "PostViewSketch",
+    "PostCounterShard",
+    "PostTrendingScore",
+    "TimelineEntry",
+    "NotificationFanoutJob",
+    "UserStatsRollup",
+    "UserDailyStats"
 ]
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Text, Boolean, Integer, TIMESTAMP, ForeignKey, Index
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy import Column, String, Text, Boolean, Integer, Float, LargeBinary, Date, TIMESTAMP, ForeignKey, Index, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 import uuid
 from app.models.base import Base
 
@@ -19,6 +19,10 @@ class User(Base):
     github_access_token = Column(Text, nullable=True)
     github_webhook_id = Column(String(100), nullable=True)
     is_github_connected = Column(Boolean, default=False)
+    fanout_on_read = Column(Boolean, default=False)  # Too many followers; posts are merged into timelines on read
+    unread_notifications = Column(Integer, default=0)
+    notifications_version = Column(Integer, default=0)  # Bumped on every change to the user's notifications
+    token_version = Column(Integer, nullable=False, default=0)  # Tokens carrying an older version are rejected
 
     bio = Column(Text, nullable=True)
     social_links = Column(JSONB, nullable=True)  # [{"platform": "linkedin", "url": "..."}]
@@ -122,16 +126,19 @@ class BlogPost(Base):
     folder_id = Column(String(36), ForeignKey("blog_folders.id", ondelete="SET NULL"), nullable=True)
     title = Column(String(500), nullable=False)
     slug = Column(String(500), nullable=False)
-    content_md = Column(Text, nullable=False)
-    content_blocks = Column(JSONB, nullable=True)
+    # Potentially large; deferred so list queries never load them implicitly
+    content_md = deferred(Column(Text, nullable=False), group="content")
+    content_blocks = deferred(Column(JSONB, nullable=True), group="content")
     excerpt = Column(Text)
     cover_image = Column(Text)
     tags = Column(JSONB)
     status = Column(String(20), default='draft')
     published_at = Column(TIMESTAMP)
     view_count = Column(Integer, default=0)
+    unique_views = Column(Integer, default=0)  # Sum of per-day unique viewer estimates
     likes_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
+    counters_sharded = Column(Boolean, nullable=False, default=False)  # Hot post; counter changes go to post_counter_shards
     github_repo_id = Column(String(36), ForeignKey("github_repositories.id", ondelete="SET NULL"), nullable=True)
     github_path = Column(String(500))
     github_sha = Column(String(100))
@@ -152,6 +159,11 @@ class BlogPost(Base):
         Index('ix_blog_posts_user_id_slug', 'user_id', 'slug', unique=True),
         Index('ix_blog_posts_status', 'status'),
         Index('ix_blog_posts_published_at', 'published_at'),
+        # Keyset pagination indexes for the public feed sort modes
+        Index('ix_blog_posts_feed_recent', 'published_at', 'id',
+              postgresql_where=text("status = 'published'")),
+        Index('ix_blog_posts_feed_popular', 'likes_count', 'published_at', 'id',
+              postgresql_where=text("status = 'published'")),
     )
 
 class Series(Base):
@@ -263,6 +275,7 @@ class Follow(Base):
         Index('ix_follows_follower_id', 'follower_id'),
         Index('ix_follows_following_id', 'following_id'),
         Index('ix_follows_unique', 'follower_id', 'following_id', unique=True),
+        Index('ix_follows_created_at', 'created_at'),
     )
 
 
@@ -281,6 +294,7 @@ class PostLike(Base):
         Index('ix_post_likes_user_id', 'user_id'),
         Index('ix_post_likes_post_id', 'post_id'),
         Index('ix_post_likes_unique', 'user_id', 'post_id', unique=True),
+        Index('ix_post_likes_created_at', 'created_at'),
     )
 
 
@@ -306,6 +320,10 @@ class Comment(Base):
         Index('ix_comments_post_id', 'post_id'),
         Index('ix_comments_parent_id', 'parent_id'),
         Index('ix_comments_created_at', 'created_at'),
+        # Keyset pagination over a post's root comments and over a comment's replies
+        Index('ix_comments_post_roots', 'post_id', 'created_at', 'id',
+              postgresql_where=text("parent_id IS NULL")),
+        Index('ix_comments_parent_created', 'parent_id', 'created_at', 'id'),
     )
 
 
@@ -319,7 +337,11 @@ class Notification(Base):
     post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), nullable=True)
     comment_id = Column(String(36), ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)
     is_read = Column(Boolean, default=False)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    actor_count = Column(Integer, default=1)  # Actors coalesced into this row; actor_id is the latest
+    sample_actor_ids = Column(JSONB, nullable=True)  # Most recent actor ids, newest first
+    # Latest activity for coalesced rows; also the monthly partition key, so it
+    # is part of the table's primary key (rows are still identified by id)
+    created_at = Column(TIMESTAMP, primary_key=True, server_default=func.now())
 
     user = relationship("User", foreign_keys=[user_id], backref="notifications_received")
     actor = relationship("User", foreign_keys=[actor_id], backref="notifications_sent")
@@ -327,29 +349,149 @@ class Notification(Base):
     comment = relationship("Comment", backref="notifications")
 
     __table_args__ = (
-        Index('ix_notifications_user_id', 'user_id'),
-        Index('ix_notifications_is_read', 'is_read'),
-        Index('ix_notifications_created_at', 'created_at'),
+        Index('ix_notifications_user_unread', 'user_id', 'is_read', text('created_at DESC')),
+        Index('ix_notifications_user_created', 'user_id', text('created_at DESC')),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
     )
+    __mapper_args__ = {'primary_key': [id]}
+
+
+class NotificationActor(Base):
+    """Distinct actors of an unread coalesced notification, so an actor acting again is not counted twice"""
+    __tablename__ = "notification_actors"
+
+    # No foreign key: notifications is partitioned and keyed on (id, created_at).
+    # Rows of read or removed notifications are pruned by the retention job
+    notification_id = Column(String(36), primary_key=True)
+    actor_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())  # The actor's latest action in the group
 
 
 class PostView(Base):
-    """Track post views by date for analytics"""
+    """Daily view counts of a post, one row per (post, month) with one array slot per day"""
     __tablename__ = "post_views"
 
+    post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # First day of the month
+    daily_views = Column(ARRAY(Integer), nullable=False)  # integer[31]; daily_views[d] is day d of the month
+    daily_unique_views = Column(ARRAY(Integer), nullable=False)  # integer[31] of unique viewer estimates
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    post = relationship("BlogPost", backref="view_history")
+
+    __table_args__ = (
+        CheckConstraint('array_length(daily_views, 1) = 31', name='ck_post_views_daily_views_len'),
+        CheckConstraint('array_length(daily_unique_views, 1) = 31', name='ck_post_views_daily_unique_views_len'),
+        Index('ix_post_views_month', 'month'),
+    )
+
+
+class PostViewSketch(Base):
+    """HyperLogLog of viewer keys for a post's still-open day; pruned once the day is over"""
+    __tablename__ = "post_view_sketches"
+
+    post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True)
+    view_date = Column(Date, primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)  # HyperLogLog registers of viewer keys
+    unique_views = Column(Integer, nullable=False, default=0)  # Estimate last written to post_views
+
+    __table_args__ = (
+        Index('ix_post_view_sketches_view_date', 'view_date'),
+    )
+
+
+class PostCounterShard(Base):
+    """Unfolded counter changes of a hot post, spread over several rows to avoid lock contention"""
+    __tablename__ = "post_counter_shards"
+
+    post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    likes_count = Column(Integer, nullable=False, default=0)
+    comments_count = Column(Integer, nullable=False, default=0)
+    view_count = Column(Integer, nullable=False, default=0)
+    unique_views = Column(Integer, nullable=False, default=0)
+    writes = Column(Integer, nullable=False, default=0)  # Changes applied since the last compaction
+
+
+class PostTrendingScore(Base):
+    """Precomputed time-decayed trending score per post, refreshed by a background job"""
+    __tablename__ = "post_trending_scores"
+
+    post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)  # log-space decayed activity, comparable across refreshes
+    last_activity_at = Column(TIMESTAMP, nullable=False)  # Most recent view day or like in the window
+    computed_at = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index('ix_post_trending_scores_score', 'score'),
+        Index('ix_post_trending_scores_last_activity_at', 'last_activity_at'),
+    )
+
+
+class TimelineEntry(Base):
+    """Post pushed into a follower's home timeline (fan-out-on-write)"""
+    __tablename__ = "timeline_entries"
+
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)  # Timeline owner
+    post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), primary_key=True)
+    author_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    published_at = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index('ix_timeline_entries_user_published', 'user_id', 'published_at', 'post_id'),
+        Index('ix_timeline_entries_post_id', 'post_id'),
+    )
+
+
+class UserStatsRollup(Base):
+    """Per-user dashboard totals, kept current by the write paths (see user_stats_service)"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    posts_count = Column(Integer, nullable=False, default=0)  # Published posts
+    views_count = Column(Integer, nullable=False, default=0)  # Sum of view_count over all posts
+    unique_views_count = Column(Integer, nullable=False, default=0)
+    likes_received = Column(Integer, nullable=False, default=0)
+    comments_received = Column(Integer, nullable=False, default=0)
+    likes_given = Column(Integer, nullable=False, default=0)
+    followers_count = Column(Integer, nullable=False, default=0)
+    following_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+
+class UserDailyStats(Base):
+    """Activity on a user's posts and profile per day, rolled up by a background job"""
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    views = Column(Integer, nullable=False, default=0)
+    unique_views = Column(Integer, nullable=False, default=0)
+    likes = Column(Integer, nullable=False, default=0)  # Likes received
+    comments = Column(Integer, nullable=False, default=0)  # Comments received
+    follows = Column(Integer, nullable=False, default=0)  # New followers
+    computed_at = Column(TIMESTAMP, nullable=False)
+
+
+class NotificationFanoutJob(Base):
+    """Pending per-follower work of a published post (notifications or timeline entries), done in chunks"""
+    __tablename__ = "notification_fanout_jobs"
+
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     post_id = Column(String(36), ForeignKey("blog_posts.id", ondelete="CASCADE"), nullable=False)
-    view_date = Column(TIMESTAMP, nullable=False)  # Date of the view (truncated to day)
-    view_count = Column(Integer, default=1)  # Count for that day
+    author_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False, default="notification")  # notification (announced once), timeline
+    status = Column(String(20), nullable=False, default="pending")  # pending, done, cancelled, rate_limited, failed
+    last_follower_id = Column(String(36), nullable=False, default="")  # Keyset position; resume point
+    delivered = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)  # Failed chunks in a row
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
-    post = relationship("BlogPost", backref="view_history")
-
     __table_args__ = (
-        Index('ix_post_views_post_id', 'post_id'),
-        Index('ix_post_views_view_date', 'view_date'),
-        Index('ix_post_views_post_date', 'post_id', 'view_date', unique=True),
+        Index('ix_notification_fanout_jobs_post_kind', 'post_id', 'kind', unique=True),
+        Index('ix_notification_fanout_jobs_status_updated', 'status', 'updated_at'),
+        Index('ix_notification_fanout_jobs_author_created', 'author_id', 'created_at'),
     )
 
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
@@ -78,6 +78,33 @@ class BlogPostResponse(BlogPostBase):
         from_attributes = True
 
 
+class BlogPostListItem(BaseModel):
+    """Post in the author's post list; content is only included on request"""
+    id: str
+    user_id: str
+    series_id: Optional[str]
+    folder_id: Optional[str]
+    github_repo_id: Optional[str]
+    github_path: Optional[str]
+    github_sha: Optional[str]
+    title: str
+    slug: str
+    excerpt: Optional[str] = None
+    cover_image: Optional[str] = None
+    tags: Optional[List[str]] = None
+    status: str
+    published_at: Optional[datetime]
+    view_count: int
+    likes_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+    content_md: Optional[str] = None
+    content_blocks: Optional[List[Any]] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Public schemas for feed/public API
 class AuthorPublic(BaseModel):
     id: str
@@ -104,15 +131,25 @@ class BlogPostPublic(BaseModel):
     comments_count: int = 0
     created_at: datetime
     author: AuthorPublic
+    # Viewer state, only set when the request is authenticated
+    liked_by_me: Optional[bool] = None
+    author_followed: Optional[bool] = None
 
     class Config:
         from_attributes = True
 
 
+class FeedPage(BaseModel):
+    """Cursor-paginated feed envelope"""
+    posts: List[BlogPostPublic]
+    next_cursor: Optional[str] = None  # None when there are no more posts
+
+
 class BlogPostDetailPublic(BlogPostPublic):
     content_md: str
     content_blocks: Optional[List[Any]] = None
     github_repo_id: Optional[str] = None
+    unique_views: int = 0  # Sum of daily unique viewer estimates
 
     class Config:
         from_attributes = True
@@ -173,21 +210,55 @@ class CommentResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     replies: List["CommentResponse"] = []
+    reply_count: int = 0  # Visible direct replies, loaded or not
+    has_more_replies: bool = False  # More replies than included in `replies`
 
     class Config:
         from_attributes = True
 
 
+class CommentPage(BaseModel):
+    """Cursor-paginated comment envelope"""
+    comments: List[CommentResponse]
+    next_cursor: Optional[str] = None  # None when there are no more comments
+
+
 # Stats History for charts
 class DailyStats(BaseModel):
     date: str
     views: int = 0
+    unique_views: int = 0
     likes: int = 0
     comments: int = 0
+    follows: int = 0
+
+
+class MetricAnalytics(BaseModel):
+    total: int  # Sum over the requested range
+    previous_total: int  # Sum over the same number of days before it
+    growth: Optional[float] = None  # (total - previous_total) / previous_total; None without a previous value
+    ma7: List[float]  # Trailing 7-day mean for each day of daily_stats
+    ma28: List[float]  # Trailing 28-day mean for each day of daily_stats
+
+
+class PostPercentile(BaseModel):
+    post_id: str
+    title: str
+    views: int  # Views over the requested range
+    likes: int  # Likes over the requested range
+    views_percentile: float  # Percentile rank (0-100) among the user's published posts
+    likes_percentile: float
+
+
+class StatsAnalytics(BaseModel):
+    metrics: Dict[str, MetricAnalytics]  # Keyed by views, unique_views, likes, comments, follows
+    posts: List[PostPercentile]  # Most viewed first
 
 
 class StatsHistory(BaseModel):
     daily_stats: List[DailyStats]
     total_views: int
+    total_unique_views: int = 0
     total_likes: int
     total_comments: int
+    analytics: Optional[StatsAnalytics] = None  # Only with ?analytics=true
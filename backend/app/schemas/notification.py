@@ -35,8 +35,10 @@ class NotificationComment(BaseModel):
 
 class NotificationResponse(BaseModel):
     id: str
-    type: str  # like, comment, follow, reply
-    actor: NotificationActor
+    type: str  # like, comment, follow, reply, new_post
+    actor: NotificationActor  # Most recent actor
+    actor_count: int = 1  # Distinct actors merged into this notification
+    sample_actor_ids: List[str] = []  # Most recent first, capped at NOTIFICATION_SAMPLE_ACTORS
     post: Optional[NotificationPost] = None
     comment: Optional[NotificationComment] = None
     is_read: bool
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
 from datetime import datetime
 
 
@@ -43,7 +43,8 @@ class FollowerUser(BaseModel):
     github_username: Optional[str] = None
     avatar_url: Optional[str] = None
     bio: Optional[str] = None
-    is_following: bool = False
+    is_following: bool = False  # Whether current user follows this user
+    follows_you: bool = False  # Whether this user follows current user
 
     class Config:
         from_attributes = True
@@ -59,6 +60,14 @@ class LikeResponse(BaseModel):
         from_attributes = True
 
 
+class LikedStatesRequest(BaseModel):
+    post_ids: List[str] = Field(..., max_length=100)
+
+
+class LikedStatesResponse(BaseModel):
+    liked: Dict[str, bool]  # post_id -> liked by current user
+
+
 class FeedFilters(BaseModel):
     sort_by: str = "recent"  # recent, popular, liked
     page: int = 1
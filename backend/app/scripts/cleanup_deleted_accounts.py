@@ -10,7 +10,8 @@ Or set up a cron job:
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models.base import SessionLocal
-from app.models import User
+from app.models import User, Notification
+from app.api.v1.endpoints.notifications import discard_notifications
 
 def cleanup_deleted_accounts():
     """
@@ -35,6 +36,7 @@ def cleanup_deleted_accounts():
 
         for user in deleted_users:
             print(f"  - Deleting user: {user.username} (ID: {user.id}, deleted_at: {user.deleted_at})")
+            discard_notifications(db, Notification.actor_id == user.id)
             db.delete(user)
 
         db.commit()
@@ -0,0 +1,39 @@
+"""
+Fold sharded hot-post counters back into blog_posts.
+
+Hot posts add their like, comment and view changes to post_counter_shards
+instead of updating their blog_posts row; this job sums the shards into
+blog_posts, clears them, and returns posts that cooled down to plain
+counters. List pages show the folded values, so run it every minute.
+
+Run this script with:
+python -m app.scripts.compact_post_counters
+
+Or set up a cron job:
+* * * * * cd /path/to/backend && python -m app.scripts.compact_post_counters
+"""
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.base import SessionLocal
+from app.services.post_counters import compact_counters
+
+def run_compact_post_counters():
+    """
+    Fold every post's counter shards into blog_posts
+    """
+    db: Session = SessionLocal()
+    try:
+        result = compact_counters(db)
+        print(
+            f"[{datetime.utcnow()}] Post counters compacted: "
+            f"{result['folded']} posts folded, {result['demoted']} returned to plain counters"
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"[{datetime.utcnow()}] Error compacting post counters: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run_compact_post_counters()
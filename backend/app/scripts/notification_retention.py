@@ -0,0 +1,174 @@
+"""
+Maintain the monthly partitions of the notifications table.
+
+- Creates partitions NOTIFICATION_PARTITIONS_AHEAD months ahead. Rows for
+  a month without a partition (e.g. when this job has not run) land in
+  notifications_default and are moved into the month's partition when it
+  is created.
+- Expires whole months older than NOTIFICATION_RETENTION_DAYS by detaching
+  their partition instead of running a bulk DELETE. In "archive" mode the
+  detached table is kept as notifications_archive_yYYYYmMM; in "drop" mode
+  it is dropped. Unread notifications in an expired month go with it and
+  their recipients' unread counters are corrected first. Expired rows left
+  in notifications_default are deleted.
+- Prunes notification_actors rows of notifications that were read or
+  removed; only open groups need them.
+
+Run this script with:
+python -m app.scripts.notification_retention
+
+Or set up a cron job:
+0 3 * * * cd /path/to/backend && python -m app.scripts.notification_retention
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import List
+from sqlalchemy import delete, exists, text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.base import SessionLocal
+from app.models import Notification, NotificationActor
+from app.api.v1.endpoints.notifications import discard_notifications
+
+PARTITION_NAME = re.compile(r"^notifications_y(\d{4})m(\d{2})$")
+DEFAULT_PARTITION = "notifications_default"
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"notifications_y{month.year:04d}m{month.month:02d}"
+
+
+def _partition_months(db: Session) -> List[date]:
+    """First day of each month that has an attached partition"""
+    rows = db.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'notifications'
+    """)).scalars().all()
+
+    months = []
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def ensure_partitions(db: Session, today: date) -> List[str]:
+    """Create any missing partitions from this month to PARTITIONS_AHEAD months ahead"""
+    existing = set(_partition_months(db))
+    this_month = today.replace(day=1)
+
+    created = []
+    for offset in range(settings.NOTIFICATION_PARTITIONS_AHEAD + 1):
+        month = _add_months(this_month, offset)
+        if month in existing:
+            continue
+        name = _partition_name(month)
+        start, end = month.isoformat(), _add_months(month, 1).isoformat()
+        # Attaching fails while the default partition still holds rows of
+        # the month, so they are moved into the new table first
+        db.execute(text(f"CREATE TABLE {name} (LIKE notifications INCLUDING DEFAULTS)"))
+        db.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= '{start}' AND created_at < '{end}' RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ))
+        db.execute(text(
+            f"ALTER TABLE notifications ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        created.append(name)
+    return created
+
+
+def expire_partitions(db: Session, today: date) -> List[str]:
+    """Detach (and archive or drop) partitions that end before the retention cutoff"""
+    cutoff = today - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+
+    expired = []
+    for month in _partition_months(db):
+        next_month = _add_months(month, 1)
+        if next_month > cutoff:
+            break
+
+        discard_notifications(
+            db,
+            Notification.created_at >= month,
+            Notification.created_at < next_month
+        )
+
+        name = _partition_name(month)
+        db.execute(text(f"ALTER TABLE notifications DETACH PARTITION {name}"))
+        if settings.NOTIFICATION_RETENTION_MODE == "drop":
+            db.execute(text(f"DROP TABLE {name}"))
+        else:
+            db.execute(text(f"ALTER TABLE {name} RENAME TO {name.replace('notifications_', 'notifications_archive_', 1)}"))
+        expired.append(name)
+    return expired
+
+
+def expire_default_rows(db: Session, today: date) -> int:
+    """Delete rows of expired months from the default partition; returns how many"""
+    cutoff = today - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    # Same boundary as expire_partitions: months that ended by the cutoff
+    expired = Notification.created_at < cutoff.replace(day=1)
+
+    discard_notifications(db, expired)
+    return db.execute(
+        delete(Notification).where(expired).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def prune_notification_actors(db: Session) -> int:
+    """Delete actor rows of notifications that are no longer unread groups; returns how many"""
+    return db.execute(
+        delete(NotificationActor).where(
+            ~exists().where(
+                Notification.id == NotificationActor.notification_id,
+                Notification.is_read == False
+            )
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def run_notification_retention():
+    """
+    Create upcoming partitions and expire old ones
+    """
+    db: Session = SessionLocal()
+    try:
+        today = datetime.utcnow().date()
+
+        created = ensure_partitions(db, today)
+        db.commit()
+
+        expired = expire_partitions(db, today)
+        db.commit()
+
+        expired_default = expire_default_rows(db, today)
+        db.commit()
+
+        pruned_actors = prune_notification_actors(db)
+        db.commit()
+
+        print(
+            f"[{datetime.utcnow()}] Notification partitions: {len(created)} created {created}, "
+            f"{len(expired)} expired ({settings.NOTIFICATION_RETENTION_MODE}) {expired}, "
+            f"{expired_default} expired rows deleted from {DEFAULT_PARTITION}, "
+            f"{pruned_actors} notification actors pruned"
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"[{datetime.utcnow()}] Error maintaining notification partitions: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run_notification_retention()
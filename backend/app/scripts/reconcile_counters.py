@@ -0,0 +1,75 @@
+"""
+Reconcile blog_posts counters with their source tables.
+
+likes_count, comments_count, view_count and unique_views are recomputed
+from post_likes, comments (not deleted) and the post_views arrays, minus
+changes still waiting in counter shards. Posts are processed in primary-key
+ranges of --chunk-size with one set-based UPDATE per range, so the job does
+not hold locks on the whole table. Only drifted rows are written.
+
+Views from before per-day view history existed are not in post_views; pass
+--only likes_count,comments_count to leave view counts of such posts alone.
+Run app.scripts.repair_user_stats afterwards so the per-user totals follow.
+
+Run this script with:
+python -m app.scripts.reconcile_counters [--dry-run] [--only likes_count,comments_count] [--chunk-size N]
+
+Or set up a cron job:
+0 5 * * * cd /path/to/backend && python -m app.scripts.reconcile_counters
+"""
+import argparse
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.base import SessionLocal
+from app.services.post_counters import COUNTERS, reconcile_counters
+
+REPORT_SAMPLES = 20
+
+def run_reconcile_counters(counters=COUNTERS, dry_run=False, chunk_size=10000):
+    """
+    Recompute post counters, or with dry_run only report the differences
+    """
+    db: Session = SessionLocal()
+    try:
+        drifted = {name: 0 for name in counters}
+        net = {name: 0 for name in counters}
+        samples = []
+        posts = 0
+        for rows in reconcile_counters(db, counters, dry_run=dry_run, chunk_size=chunk_size):
+            posts += len(rows)
+            for row in rows:
+                for name in counters:
+                    stored = getattr(row, f"stored_{name}") or 0
+                    expected = getattr(row, f"expected_{name}")
+                    if stored != expected:
+                        drifted[name] += 1
+                        net[name] += expected - stored
+                        if len(samples) < REPORT_SAMPLES:
+                            samples.append(f"  {row.post_id} {name}: {stored} -> {expected}")
+
+        action = "would change" if dry_run else "changed"
+        print(f"[{datetime.utcnow()}] Post counters reconciled: {posts} posts {action}")
+        for name in counters:
+            print(f"  {name}: {drifted[name]} posts, net {net[name]:+d}")
+        if samples:
+            print("Examples:")
+            print("\n".join(samples))
+    except Exception as e:
+        db.rollback()
+        print(f"[{datetime.utcnow()}] Error reconciling post counters: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Report differences without writing")
+    parser.add_argument("--only", default=",".join(COUNTERS), help="Comma-separated counters to reconcile")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Posts per UPDATE")
+    args = parser.parse_args()
+
+    counters = tuple(name.strip() for name in args.only.split(",") if name.strip())
+    unknown = set(counters) - set(COUNTERS)
+    if unknown:
+        parser.error(f"unknown counters: {', '.join(sorted(unknown))}")
+    run_reconcile_counters(counters, dry_run=args.dry_run, chunk_size=args.chunk_size)
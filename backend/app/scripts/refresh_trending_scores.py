@@ -0,0 +1,37 @@
+"""
+Refresh precomputed trending scores for the public feed.
+
+Only posts with views or likes since the previous run are recomputed, so the
+job is cheap enough to run every few minutes.
+
+Run this script with:
+python -m app.scripts.refresh_trending_scores
+
+Or set up a cron job:
+*/5 * * * * cd /path/to/backend && python -m app.scripts.refresh_trending_scores
+"""
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.base import SessionLocal
+from app.services.trending_service import refresh_trending_scores
+
+def run_refresh_trending_scores():
+    """
+    Recompute trending scores for posts with new activity
+    """
+    db: Session = SessionLocal()
+    try:
+        result = refresh_trending_scores(db)
+        print(
+            f"[{datetime.utcnow()}] Trending scores refreshed: "
+            f"{result['updated']} updated, {result['expired']} expired (activity since {result['since']})"
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"[{datetime.utcnow()}] Error refreshing trending scores: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run_refresh_trending_scores()
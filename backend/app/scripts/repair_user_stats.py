@@ -0,0 +1,35 @@
+"""
+Repair the user_stats rollup by recomputing it from the source tables.
+
+The rollup is maintained incrementally by the write paths; this job fixes
+rows that drifted (e.g. after cascading account deletes) in one bulk upsert.
+
+Run this script with:
+python -m app.scripts.repair_user_stats
+
+Or set up a cron job:
+30 4 * * * cd /path/to/backend && python -m app.scripts.repair_user_stats
+"""
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models.base import SessionLocal
+from app.services.user_stats_service import recompute_user_stats
+
+def run_repair_user_stats():
+    """
+    Recompute every user's stats row
+    """
+    db: Session = SessionLocal()
+    try:
+        repaired = recompute_user_stats(db)
+        db.commit()
+        print(f"[{datetime.utcnow()}] User stats repaired: {repaired} rows missing or out of date")
+    except Exception as e:
+        db.rollback()
+        print(f"[{datetime.utcnow()}] Error repairing user stats: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run_repair_user_stats()
@@ -0,0 +1,41 @@
+"""
+Roll up per-user daily analytics into user_daily_stats.
+
+Each run rebuilds only the days since the previous run. Pass --days N to
+rebuild the last N days (e.g. after a backfill or to pick up unlikes).
+
+Run this script with:
+python -m app.scripts.rollup_daily_stats [--days N]
+
+Or set up a cron job:
+*/5 * * * * cd /path/to/backend && python -m app.scripts.rollup_daily_stats
+"""
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from app.models.base import SessionLocal
+from app.services.daily_stats_service import rollup_daily_stats
+
+def run_rollup_daily_stats(days=None):
+    """
+    Rebuild daily stats for recent days
+    """
+    db: Session = SessionLocal()
+    try:
+        start = datetime.utcnow().date() - timedelta(days=days - 1) if days else None
+        result = rollup_daily_stats(db, start)
+        print(
+            f"[{datetime.utcnow()}] Daily stats rolled up since {result['since']}: "
+            f"{result['inserted']} rows written, {result['deleted']} replaced"
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"[{datetime.utcnow()}] Error rolling up daily stats: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=None, help="Rebuild the last N days")
+    run_rollup_daily_stats(parser.parse_args().days)
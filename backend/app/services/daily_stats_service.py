@@ -0,0 +1,83 @@
+"""
+Daily per-user analytics rollup (user_daily_stats).
+
+Each run rebuilds the days from the previous run's day to today in one
+transaction: rows for those days are deleted and re-inserted from a single
+grouped INSERT ... SELECT over views, likes, comments and follows. Views
+are unnested from the monthly post_views arrays of the months involved;
+the other filters are plain range predicates on created_at, so the source
+indexes are used. Activity is always stamped at or after the time it is
+written, so nothing older than the last run can have changed, apart from
+likes, comments and follows removed later; rebuild a longer range to pick
+those up.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from sqlalchemy import select, union_all, literal, func, delete
+from sqlalchemy.orm import Session
+from app.models import BlogPost, PostLike, Comment, Follow, UserDailyStats
+from app.services.view_history import daily_views_select
+
+
+def rollup_daily_stats(db: Session, start: Optional[date] = None) -> dict:
+    """
+    Rebuild user_daily_stats from start (default: the day of the previous
+    run, or everything on the first run) through today
+    """
+    if start is None:
+        last_run = db.query(func.max(UserDailyStats.computed_at)).scalar()
+        # A day of slack covers views flushed just after midnight
+        start = (last_run - timedelta(days=1)).date() if last_run else date.min
+    since = datetime.combine(start, time())
+
+    zero = literal(0)
+    daily_views = daily_views_select(start).subquery()
+    views = select(
+        BlogPost.user_id.label("user_id"),
+        daily_views.c.view_date.label("day"),
+        daily_views.c.views.label("views"),
+        daily_views.c.unique_views.label("unique_views"),
+        zero.label("likes"),
+        zero.label("comments"),
+        zero.label("follows"),
+    ).join(BlogPost, BlogPost.id == daily_views.c.post_id)
+
+    likes = select(
+        BlogPost.user_id, func.date(PostLike.created_at), zero, zero, literal(1), zero, zero
+    ).join(BlogPost, BlogPost.id == PostLike.post_id).where(PostLike.created_at >= since)
+
+    comments = select(
+        BlogPost.user_id, func.date(Comment.created_at), zero, zero, zero, literal(1), zero
+    ).join(BlogPost, BlogPost.id == Comment.post_id).where(
+        Comment.created_at >= since,
+        Comment.is_deleted == False
+    )
+
+    follows = select(
+        Follow.following_id, func.date(Follow.created_at), zero, zero, zero, zero, literal(1)
+    ).where(Follow.created_at >= since)
+
+    activity = union_all(views, likes, comments, follows).subquery()
+    rolled = select(
+        activity.c.user_id,
+        activity.c.day,
+        func.coalesce(func.sum(activity.c.views), 0),
+        func.coalesce(func.sum(activity.c.unique_views), 0),
+        func.sum(activity.c.likes),
+        func.sum(activity.c.comments),
+        func.sum(activity.c.follows),
+        func.now(),
+    ).group_by(activity.c.user_id, activity.c.day)
+
+    deleted = db.execute(
+        delete(UserDailyStats).where(UserDailyStats.date >= start).execution_options(synchronize_session=False)
+    ).rowcount
+    inserted = db.execute(
+        UserDailyStats.__table__.insert().from_select(
+            ["user_id", "date", "views", "unique_views", "likes", "comments", "follows", "computed_at"],
+            rolled
+        )
+    ).rowcount
+    db.commit()
+
+    return {"since": start, "deleted": deleted, "inserted": inserted}
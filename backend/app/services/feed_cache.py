@@ -0,0 +1,124 @@
+"""
+Materialized first pages of the public feed.
+
+Keeps the serialized top FEED_CACHE_SIZE posts per sort mode in process
+memory. Entries are dropped by the write paths that change them (publish,
+unpublish, edits, likes, author deactivation); the TTL is only a backstop for
+changes made by other workers or background jobs.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# (sort key, author id, serialized post)
+FeedEntry = Tuple[tuple, str, dict]
+
+
+class CachedFeed:
+    def __init__(self, entries: List[FeedEntry], complete: bool):
+        self.entries = entries
+        self.complete = complete  # True when the whole feed fit in the cache
+        self.post_ids = {entry[2]["id"] for entry in entries}
+        self.author_ids = {entry[1] for entry in entries}
+        self.built_at = time.monotonic()
+
+    def page(self, offset: int, limit: int) -> Optional[List[FeedEntry]]:
+        """Entries [offset, offset + limit), or None if the cache cannot answer"""
+        if offset + limit > len(self.entries) and not self.complete:
+            return None
+        return self.entries[offset:offset + limit]
+
+    def after(self, key: Optional[tuple], limit: int) -> Optional[List[FeedEntry]]:
+        """
+        Up to limit + 1 entries sorted after `key` (the extra entry signals a next page),
+        or None if the cache cannot answer
+        """
+        start = 0
+        if key is not None:
+            start = len(self.entries)
+            for i, entry in enumerate(self.entries):
+                if entry[0] < key:
+                    start = i
+                    break
+
+        window = self.entries[start:start + limit + 1]
+        if len(window) <= limit and not self.complete:
+            return None
+        return window
+
+
+class FeedPageCache:
+    def __init__(self, size: int, ttl_seconds: float):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._feeds: Dict[str, CachedFeed] = {}
+        self._generations: Dict[str, int] = {}
+
+    def get(self, sort_by: str, build: Callable[[int], List[FeedEntry]]) -> CachedFeed:
+        """Return the cached feed for a sort mode, rebuilding it with build(size) on a miss"""
+        with self._lock:
+            cached = self._feeds.get(sort_by)
+            if cached and time.monotonic() - cached.built_at < self.ttl_seconds:
+                metrics.incr("feed_cache.hits")
+                return cached
+            generation = self._generations.get(sort_by, 0)
+
+        metrics.incr("feed_cache.misses")
+        with metrics.timer("feed_cache.rebuild_seconds"):
+            entries = build(self.size)
+        cached = CachedFeed(entries, complete=len(entries) < self.size)
+
+        with self._lock:
+            # Don't store a feed that was invalidated while it was being rebuilt
+            if self._generations.get(sort_by, 0) == generation:
+                self._feeds[sort_by] = cached
+        return cached
+
+    def _drop(self, sort_by: str) -> None:
+        # Caller holds the lock
+        self._generations[sort_by] = self._generations.get(sort_by, 0) + 1
+        if self._feeds.pop(sort_by, None) is not None:
+            metrics.incr("feed_cache.invalidations")
+
+    def invalidate(self, sort_by: Optional[str] = None) -> None:
+        """Drop one sort mode, or every mode when sort_by is None (publish/unpublish)"""
+        with self._lock:
+            for mode in ([sort_by] if sort_by else list(set(self._feeds) | set(self._generations))):
+                self._drop(mode)
+
+    def invalidate_post(self, post_id: str, likes_count: Optional[int] = None) -> None:
+        """
+        Drop modes whose cached pages contain the post.
+        Pass likes_count on like changes so `popular` is also dropped when
+        the post may have climbed into the cached top N.
+        """
+        with self._lock:
+            for mode, cached in list(self._feeds.items()):
+                if post_id in cached.post_ids:
+                    self._drop(mode)
+                elif mode == "popular" and likes_count is not None and not cached.complete:
+                    # entries are sorted by (likes_count, ...) desc; compare with the cutoff
+                    if not cached.entries or likes_count >= cached.entries[-1][0][0]:
+                        self._drop(mode)
+
+    def invalidate_author(self, author_id: str) -> None:
+        """Drop modes showing posts by an author who was deactivated or restored"""
+        with self._lock:
+            for mode, cached in list(self._feeds.items()):
+                if author_id in cached.author_ids:
+                    self._drop(mode)
+
+    def hit_ratio(self) -> float:
+        hits = metrics.counter("feed_cache.hits")
+        total = hits + metrics.counter("feed_cache.misses")
+        return hits / total if total else 0.0
+
+
+feed_cache = FeedPageCache(
+    size=settings.FEED_CACHE_SIZE,
+    ttl_seconds=settings.FEED_CACHE_TTL_SECONDS,
+)
+metrics.register_gauge("feed_cache.hit_ratio", feed_cache.hit_ratio)
@@ -0,0 +1,192 @@
+"""
+Pub/sub bus that wakes notification streams when a notification is created.
+
+Events carry only (user_id, notification_id); stream handlers read the
+notifications themselves, so the database stays the source of truth and a
+reconnecting client resumes from its Last-Event-ID with a plain query.
+
+Publishing is transactional: an event is only delivered once the session
+that created the notification commits, and is dropped on rollback.
+
+- InProcessNotificationBus delivers after commit within this worker. Use it
+  with a single worker.
+- PostgresNotificationBus sends pg_notify in the creating transaction and
+  keeps one LISTEN connection per worker, so every worker sees every event.
+"""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import select
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy import event, func, text
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.base import engine
+
+CHANNEL = "notifications"
+_PENDING_KEY = "pending_notification_events"
+
+
+class Subscription:
+    """One connected stream; wakes its event loop when the user gets a notification"""
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self._loop = loop
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        # Called from request and listener threads
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a notification; returns False on timeout"""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._wake.clear()
+        return True
+
+
+class NotificationBus(ABC):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, user_id: str) -> Subscription:
+        """Register a stream for user_id; call from the stream's event loop"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    @abstractmethod
+    def publish(self, db: Session, user_id: str, notification_id: str) -> None:
+        """Announce a notification to user_id's streams once db commits"""
+
+    def publish_many(self, db: Session, events: Iterable[Tuple[str, str]]) -> None:
+        """Announce several (user_id, notification_id) pairs once db commits"""
+        for user_id, notification_id in events:
+            self.publish(db, user_id, notification_id)
+
+    def _deliver(self, user_id: str) -> None:
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+        metrics.incr("notification_bus.delivered", len(subscriptions))
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class InProcessNotificationBus(NotificationBus):
+    def publish(self, db: Session, user_id: str, notification_id: str) -> None:
+        db.info.setdefault(_PENDING_KEY, []).append(user_id)
+
+
+class PostgresNotificationBus(NotificationBus):
+    def __init__(self, reconnect_seconds: float = 5.0):
+        super().__init__()
+        self.reconnect_seconds = reconnect_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, db: Session, user_id: str, notification_id: str) -> None:
+        # NOTIFY is queued with the transaction and only sent on commit
+        payload = json.dumps({"user_id": user_id, "id": notification_id})
+        db.execute(sql_select(func.pg_notify(CHANNEL, payload)))
+
+    def publish_many(self, db: Session, events: Iterable[Tuple[str, str]]) -> None:
+        payloads = [json.dumps({"user_id": user_id, "id": notification_id}) for user_id, notification_id in events]
+        if payloads:
+            db.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {"channel": CHANNEL, "payloads": payloads}
+            )
+
+    def _listen(self) -> None:
+        # Detached from the pool: autocommit stays on this connection only,
+        # and close() really closes it
+        connection = engine.raw_connection()
+        connection.detach()
+        try:
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"LISTEN {CHANNEL}")
+            while not self._stop.is_set():
+                # Wake up every second to notice stop()
+                if select.select([dbapi_connection], [], [], 1.0) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    note = dbapi_connection.notifies.pop(0)
+                    try:
+                        self._deliver(json.loads(note.payload)["user_id"])
+                    except (ValueError, KeyError):
+                        metrics.incr("notification_bus.bad_payloads")
+        finally:
+            connection.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                metrics.incr("notification_bus.listen_errors")
+                print(f"[{datetime.utcnow()}] Notification listener failed: {str(e)}")
+                self._stop.wait(self.reconnect_seconds)
+
+    def start(self) -> None:
+        """Start the LISTEN thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if settings.NOTIFICATION_BUS == "postgres":
+    notification_bus: NotificationBus = PostgresNotificationBus()
+else:
+    notification_bus = InProcessNotificationBus()
+
+metrics.register_gauge("notification_bus.subscribers", notification_bus.subscriber_count)
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        notification_bus._deliver(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,231 @@
+"""
+Per-follower work of a newly published post: "new post" notifications and
+home timeline entries (timeline_service.fan_out_chunk).
+
+Publishing only enqueues NotificationFanoutJob rows, one per kind, so the
+request returns immediately. A background worker walks the author's
+followers in keyset chunks and writes each chunk with one multi-row INSERT,
+committing the job's position with it; a restarted worker resumes from
+last_follower_id. Jobs are claimed with SKIP LOCKED, so several
+workers can share the queue.
+
+Back-pressure: after each chunk the worker sleeps at least as long as the
+chunk took, so fan-out never uses more than about half of a connection's
+time and slows down by itself when the database does.
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models import BlogPost, Follow, Notification, NotificationFanoutJob, User
+from app.models.base import SessionLocal
+from app.services.notification_bus import notification_bus
+from app.services import timeline_service
+
+
+def enqueue_post(db: Session, post: BlogPost) -> None:
+    """Queue follower notifications for a newly published post, in the caller's transaction"""
+    recent = db.query(func.count(NotificationFanoutJob.id)).filter(
+        NotificationFanoutJob.author_id == post.user_id,
+        NotificationFanoutJob.kind == "notification",
+        NotificationFanoutJob.status != "rate_limited",
+        NotificationFanoutJob.created_at >= datetime.utcnow() - timedelta(days=1)
+    ).scalar()
+    status = "pending" if recent < settings.NOTIFICATION_FANOUT_MAX_POSTS_PER_DAY else "rate_limited"
+    if status == "rate_limited":
+        metrics.incr("notification_fanout.rate_limited")
+
+    # A post is announced at most once, even if it is unpublished and republished
+    db.execute(insert(NotificationFanoutJob).values(
+        id=str(uuid.uuid4()),
+        post_id=post.id,
+        author_id=post.user_id,
+        kind="notification",
+        status=status,
+        last_follower_id="",
+        delivered=0,
+        attempts=0,
+    ).on_conflict_do_nothing(index_elements=[NotificationFanoutJob.post_id, NotificationFanoutJob.kind]))
+
+
+def enqueue_timeline(db: Session, post: BlogPost) -> None:
+    """Queue the timeline fan-out of a published post, in the caller's transaction"""
+    # A republished post is pushed again from the first follower
+    stmt = insert(NotificationFanoutJob).values(
+        id=str(uuid.uuid4()),
+        post_id=post.id,
+        author_id=post.user_id,
+        kind="timeline",
+        status="pending",
+        last_follower_id="",
+        delivered=0,
+        attempts=0,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[NotificationFanoutJob.post_id, NotificationFanoutJob.kind],
+        set_={"status": "pending", "last_follower_id": "", "delivered": 0, "attempts": 0, "updated_at": func.now()},
+    ))
+
+
+def _notify_chunk(db: Session, job: NotificationFanoutJob) -> List[str]:
+    follower_ids = [
+        row.follower_id for row in db.query(Follow.follower_id).filter(
+            Follow.following_id == job.author_id,
+            Follow.follower_id > job.last_follower_id
+        ).order_by(Follow.follower_id).limit(settings.NOTIFICATION_FANOUT_CHUNK_SIZE).all()
+    ]
+
+    if follower_ids:
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": follower_id,
+                "actor_id": job.author_id,
+                "type": "new_post",
+                "post_id": job.post_id,
+                "is_read": False,
+                "actor_count": 1,
+                "sample_actor_ids": [job.author_id],
+            }
+            for follower_id in follower_ids
+        ]
+        db.execute(insert(Notification).values(rows))
+        db.execute(
+            update(User).where(User.id.in_(follower_ids)).values(
+                unread_notifications=func.coalesce(User.unread_notifications, 0) + 1,
+                notifications_version=func.coalesce(User.notifications_version, 0) + 1
+            ).execution_options(synchronize_session=False)
+        )
+        notification_bus.publish_many(db, [(row["user_id"], row["id"]) for row in rows])
+    return follower_ids
+
+
+def run_chunk(db: Session, job: NotificationFanoutJob) -> int:
+    """Run the next chunk of the job's followers; returns how many were reached"""
+    post = db.query(BlogPost).filter(BlogPost.id == job.post_id).first()
+    if post is None or post.status != "published":
+        job.status = "cancelled"
+        return 0
+
+    if job.kind == "timeline":
+        follower_ids = timeline_service.fan_out_chunk(db, post, job.last_follower_id)
+        chunk_size = settings.TIMELINE_FANOUT_CHUNK_SIZE
+    else:
+        follower_ids = _notify_chunk(db, job)
+        chunk_size = settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+
+    if follower_ids:
+        job.last_follower_id = follower_ids[-1]
+        job.delivered = (job.delivered or 0) + len(follower_ids)
+
+    if len(follower_ids) < chunk_size:
+        job.status = "done"
+    job.updated_at = datetime.utcnow()
+    return len(follower_ids)
+
+
+def _record_failure(db: Session, job_id: str) -> None:
+    attempts = NotificationFanoutJob.attempts + 1
+    db.execute(
+        update(NotificationFanoutJob).where(NotificationFanoutJob.id == job_id).values(
+            attempts=attempts,
+            status=case((attempts >= settings.NOTIFICATION_FANOUT_MAX_ATTEMPTS, "failed"), else_=NotificationFanoutJob.status),
+            updated_at=func.now(),
+        ).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    metrics.incr("notification_fanout.failures")
+
+
+def process_next_chunk() -> Optional[int]:
+    """
+    Claim the least recently advanced pending job and run one chunk of it.
+    Returns the number of followers notified, or None when the queue is empty.
+    Interleaving jobs chunk by chunk keeps small fan-outs from waiting on big ones.
+
+    A failed chunk moves its job to the back of the queue; after
+    NOTIFICATION_FANOUT_MAX_ATTEMPTS failures in a row the job is marked failed.
+    """
+    db = SessionLocal()
+    job_id = None
+    try:
+        job = db.query(NotificationFanoutJob).filter(
+            NotificationFanoutJob.status == "pending"
+        ).order_by(NotificationFanoutJob.updated_at).with_for_update(skip_locked=True).first()
+        if job is None:
+            return None
+        job_id = job.id
+
+        notified = run_chunk(db, job)
+        job.attempts = 0
+        db.commit()
+        metrics.incr("notification_fanout.notified", notified)
+        return notified
+    except Exception:
+        db.rollback()
+        if job_id is not None:
+            try:
+                _record_failure(db, job_id)
+            except Exception:
+                # Report the chunk's error rather than this one
+                db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class NotificationFanoutWorker:
+    def __init__(self, poll_interval: float, min_chunk_delay: float):
+        self.poll_interval = poll_interval
+        self.min_chunk_delay = min_chunk_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def drain(self) -> int:
+        """Process chunks until the queue is empty or the worker stops; returns followers notified"""
+        total = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                with metrics.timer("notification_fanout.chunk_seconds"):
+                    notified = process_next_chunk()
+            except Exception as e:
+                metrics.incr("notification_fanout.errors")
+                print(f"[{datetime.utcnow()}] Notification fan-out chunk failed: {str(e)}")
+                return total
+            if notified is None:
+                return total
+            total += notified
+            self._stop.wait(max(self.min_chunk_delay, time.monotonic() - started))
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.drain()
+
+    def start(self) -> None:
+        """Start the background fan-out thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-fanout", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the current chunk; unfinished jobs resume on the next start"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+fanout_worker = NotificationFanoutWorker(
+    poll_interval=settings.NOTIFICATION_FANOUT_POLL_SECONDS,
+    min_chunk_delay=settings.NOTIFICATION_FANOUT_MIN_CHUNK_DELAY_SECONDS,
+)
@@ -0,0 +1,287 @@
+"""
+Post counters (likes, comments, views) with sharding for hot posts.
+
+A counter change is normally one SQL-side UPDATE of the post's blog_posts
+row. On a viral post every like and comment would lock that same row, and
+author edits would queue behind them. Once a post gets more than
+POST_COUNTER_PROMOTE_WRITES_PER_MINUTE changes in a minute in one worker,
+it is promoted: blog_posts.counters_sharded is set and later changes are
+added to one of POST_COUNTER_SHARDS rows in post_counter_shards, picked at
+random, so concurrent writers rarely wait on each other.
+
+compact_counters() folds the shard rows back into blog_posts periodically
+(app.scripts.compact_post_counters) and demotes posts that have cooled
+down. Until then, totals() adds the unfolded shards on read.
+
+reconcile_counters() (app.scripts.reconcile_counters) recomputes the
+counters from the source tables to repair drift.
+"""
+import random
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Sequence
+from sqlalchemy import select, update, delete, exists, values, column, func, or_, String, Integer
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import BlogPost, PostCounterShard, PostLike, PostView, Comment
+from app.services.view_history import daily_views_select
+
+COUNTERS = ("likes_count", "comments_count", "view_count", "unique_views")
+
+
+class _WriteRate:
+    """Counter changes per post in the current one-minute window, in this worker"""
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._counts: Dict[str, int] = {}
+
+    def record(self, post_id: str) -> int:
+        """Count a change; returns the post's changes so far in this window"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window_seconds:
+                self._window_start = now
+                self._counts = {}
+            count = self._counts[post_id] = self._counts.get(post_id, 0) + 1
+            return count
+
+
+_write_rate = _WriteRate()
+
+
+def _add_to_shards(db: Session, deltas: Dict[str, Dict[str, int]]) -> None:
+    """Add each post's deltas to one random shard row"""
+    stmt = insert(PostCounterShard).values([
+        {
+            "post_id": post_id,
+            "shard": random.randrange(settings.POST_COUNTER_SHARDS),
+            "writes": 1,
+            **{name: post_deltas.get(name, 0) for name in COUNTERS},
+        }
+        for post_id, post_deltas in sorted(deltas.items())
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[PostCounterShard.post_id, PostCounterShard.shard],
+        set_={
+            name: getattr(PostCounterShard, name) + stmt.excluded[name]
+            for name in (*COUNTERS, "writes")
+        },
+    ))
+
+
+def totals(db: Session, post_id: str) -> Optional[Row]:
+    """(user_id, *COUNTERS) of a post including changes not yet folded from its shards"""
+    shards = select(
+        PostCounterShard.post_id,
+        *[func.sum(getattr(PostCounterShard, name)).label(name) for name in COUNTERS]
+    ).where(PostCounterShard.post_id == post_id).group_by(PostCounterShard.post_id).subquery()
+
+    return db.execute(
+        select(
+            BlogPost.user_id,
+            *[
+                func.greatest(
+                    func.coalesce(getattr(BlogPost, name), 0) + func.coalesce(shards.c[name], 0), 0
+                ).label(name)
+                for name in COUNTERS
+            ]
+        ).outerjoin(shards, shards.c.post_id == BlogPost.id).where(BlogPost.id == post_id)
+    ).first()
+
+
+def add(db: Session, post_id: str, **deltas: int) -> Optional[Row]:
+    """
+    Apply counter deltas (e.g. likes_count=1) to an existing post.
+    Returns the post's (user_id, *COUNTERS) after the change.
+    """
+    row = db.execute(
+        update(BlogPost).where(
+            BlogPost.id == post_id,
+            BlogPost.counters_sharded == False
+        ).values({
+            name: func.greatest(func.coalesce(getattr(BlogPost, name), 0) + delta, 0)
+            for name, delta in deltas.items()
+        }).returning(
+            BlogPost.user_id, *[getattr(BlogPost, name) for name in COUNTERS]
+        ).execution_options(synchronize_session=False)
+    ).first()
+
+    if row is None:
+        # Sharded post; its blog_posts row is not touched
+        _add_to_shards(db, {post_id: deltas})
+        return totals(db, post_id)
+
+    if _write_rate.record(post_id) == settings.POST_COUNTER_PROMOTE_WRITES_PER_MINUTE:
+        db.execute(
+            update(BlogPost).where(BlogPost.id == post_id).values(
+                counters_sharded=True
+            ).execution_options(synchronize_session=False)
+        )
+    return row
+
+
+def add_many(db: Session, deltas: Dict[str, Dict[str, int]]) -> None:
+    """Apply counter deltas to several posts: one UPDATE, plus one shard upsert for sharded posts"""
+    if not deltas:
+        return
+    names = sorted({name for post_deltas in deltas.values() for name in post_deltas})
+
+    rows = values(
+        column("post_id", String), *[column(name, Integer) for name in names], name="deltas"
+    ).data([
+        (post_id, *[post_deltas.get(name, 0) for name in names])
+        for post_id, post_deltas in deltas.items()
+    ])
+    updated = {
+        post_id for post_id, in db.execute(
+            update(BlogPost).where(
+                BlogPost.id == rows.c.post_id,
+                BlogPost.counters_sharded == False
+            ).values({
+                name: func.greatest(func.coalesce(getattr(BlogPost, name), 0) + rows.c[name], 0)
+                for name in names
+            }).returning(BlogPost.id).execution_options(synchronize_session=False)
+        )
+    }
+
+    sharded = {post_id: post_deltas for post_id, post_deltas in deltas.items() if post_id not in updated}
+    if sharded:
+        _add_to_shards(db, sharded)
+
+
+def compact_counters(db: Session) -> dict:
+    """
+    Fold all shard rows into blog_posts and demote sharded posts with fewer
+    than POST_COUNTER_DEMOTE_WRITES changes since the previous compaction
+    """
+    # Shard rows written concurrently are re-created after the DELETE and
+    # picked up by the next run
+    folded = delete(PostCounterShard).returning(
+        PostCounterShard.post_id, *[getattr(PostCounterShard, name) for name in (*COUNTERS, "writes")]
+    ).cte("folded")
+    sums = select(
+        folded.c.post_id,
+        *[func.sum(folded.c[name]).label(name) for name in (*COUNTERS, "writes")]
+    ).group_by(folded.c.post_id).cte("sums")
+
+    still_hot = {}
+    for post_id, sharded in db.execute(
+        update(BlogPost).where(BlogPost.id == sums.c.post_id).values({
+            **{
+                name: func.greatest(func.coalesce(getattr(BlogPost, name), 0) + sums.c[name], 0)
+                for name in COUNTERS
+            },
+            "counters_sharded": sums.c.writes >= settings.POST_COUNTER_DEMOTE_WRITES,
+        }).returning(BlogPost.id, BlogPost.counters_sharded).execution_options(synchronize_session=False)
+    ):
+        still_hot[post_id] = sharded
+
+    # Sharded posts that had no changes at all
+    idle = db.execute(
+        update(BlogPost).where(
+            BlogPost.counters_sharded == True,
+            ~BlogPost.id.in_(list(still_hot)),
+            ~exists().where(PostCounterShard.post_id == BlogPost.id)
+        ).values(counters_sharded=False).execution_options(synchronize_session=False)
+    ).rowcount
+
+    db.commit()
+
+    return {
+        "folded": len(still_hot),
+        "demoted": sum(1 for sharded in still_hot.values() if not sharded) + idle,
+    }
+
+
+def _expected_counters(low: str, high: str, counters: Sequence[str] = COUNTERS):
+    """
+    SELECT, for posts with low < id <= high, each requested stored counter
+    and the value it should have: the count from the source tables minus the
+    changes still waiting in its shards. Only the source tables of the
+    requested counters are read.
+    """
+    def in_range(id_column):
+        return (id_column > low) & (id_column <= high)
+
+    query = select(
+        BlogPost.id.label("post_id"),
+        *[getattr(BlogPost, name).label(f"stored_{name}") for name in counters]
+    ).where(in_range(BlogPost.id))
+
+    sources = {}
+    if "likes_count" in counters:
+        likes = select(
+            PostLike.post_id, func.count().label("likes_count")
+        ).where(in_range(PostLike.post_id)).group_by(PostLike.post_id).subquery()
+        query = query.outerjoin(likes, likes.c.post_id == BlogPost.id)
+        sources["likes_count"] = likes
+    if "comments_count" in counters:
+        comments = select(
+            Comment.post_id, func.count().label("comments_count")
+        ).where(in_range(Comment.post_id), Comment.is_deleted == False).group_by(Comment.post_id).subquery()
+        query = query.outerjoin(comments, comments.c.post_id == BlogPost.id)
+        sources["comments_count"] = comments
+    if "view_count" in counters or "unique_views" in counters:
+        daily = daily_views_select(date.min).where(in_range(PostView.post_id)).subquery()
+        views = select(
+            daily.c.post_id,
+            func.sum(daily.c.views).label("view_count"),
+            func.sum(daily.c.unique_views).label("unique_views"),
+        ).group_by(daily.c.post_id).subquery()
+        query = query.outerjoin(views, views.c.post_id == BlogPost.id)
+        sources["view_count"] = sources["unique_views"] = views
+
+    shards = select(
+        PostCounterShard.post_id,
+        *[func.sum(getattr(PostCounterShard, name)).label(name) for name in counters]
+    ).where(in_range(PostCounterShard.post_id)).group_by(PostCounterShard.post_id).subquery()
+
+    return query.outerjoin(shards, shards.c.post_id == BlogPost.id).add_columns(*[
+        (func.coalesce(sources[name].c[name], 0) - func.coalesce(shards.c[name], 0)).label(f"expected_{name}")
+        for name in counters
+    ])
+
+
+def reconcile_counters(
+    db: Session,
+    counters: Sequence[str] = COUNTERS,
+    dry_run: bool = False,
+    chunk_size: int = 10000,
+) -> Iterator[List[Row]]:
+    """
+    Recompute counters of every post from post_likes, comments and
+    post_views, one primary-key range of chunk_size posts at a time with a
+    single UPDATE ... FROM (grouped SELECTs) per range, committed per range.
+
+    Yields, per range, the rows that were (with dry_run: would be) changed,
+    with post_id and stored_<counter>/expected_<counter> columns.
+    """
+    low = ""
+    while True:
+        page = select(BlogPost.id).where(BlogPost.id > low).order_by(BlogPost.id).limit(chunk_size).subquery()
+        high = db.execute(select(func.max(page.c.id))).scalar()
+        if high is None:
+            return
+
+        expected = _expected_counters(low, high, counters).subquery()
+        drifted = or_(*[
+            expected.c[f"stored_{name}"].is_distinct_from(expected.c[f"expected_{name}"]) for name in counters
+        ])
+        if dry_run:
+            rows = db.execute(select(expected).where(drifted)).all()
+        else:
+            rows = db.execute(
+                update(BlogPost).where(BlogPost.id == expected.c.post_id, drifted).values({
+                    name: expected.c[f"expected_{name}"] for name in counters
+                }).returning(*expected.c).execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+
+        yield rows
+        low = high
@@ -0,0 +1,65 @@
+"""
+Column-projected read path for post lists.
+
+List endpoints only need card fields and the author, so they select exactly
+those columns in one BlogPost/User join and work with plain rows instead of
+ORM entities. content_md and content_blocks are never read here.
+"""
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+from app.models import BlogPost, User
+
+CARD_COLUMNS = (
+    BlogPost.id,
+    BlogPost.title,
+    BlogPost.slug,
+    BlogPost.excerpt,
+    BlogPost.cover_image,
+    BlogPost.tags,
+    BlogPost.status,
+    BlogPost.published_at,
+    BlogPost.view_count,
+    BlogPost.likes_count,
+    BlogPost.comments_count,
+    BlogPost.created_at,
+)
+
+AUTHOR_COLUMNS = (
+    User.id.label("author_id"),
+    User.username.label("author_username"),
+    User.github_username.label("author_github_username"),
+    User.avatar_url.label("author_avatar_url"),
+    User.bio.label("author_bio"),
+)
+
+
+def post_cards_select(*extra_columns) -> Select:
+    """SELECT card columns and author fields (plus extra_columns) FROM blog_posts JOIN users"""
+    return select(*CARD_COLUMNS, *AUTHOR_COLUMNS, *extra_columns).select_from(BlogPost).join(
+        User, BlogPost.user_id == User.id
+    )
+
+
+def card_to_public(row) -> dict:
+    """Convert a post_cards_select row to the BlogPostPublic shape"""
+    return {
+        "id": row.id,
+        "title": row.title,
+        "slug": row.slug,
+        "excerpt": row.excerpt,
+        "cover_image": row.cover_image,
+        "tags": row.tags,
+        "status": row.status,
+        "published_at": row.published_at,
+        "view_count": row.view_count or 0,
+        "likes_count": row.likes_count or 0,
+        "comments_count": row.comments_count or 0,
+        "created_at": row.created_at,
+        "author": {
+            "id": row.author_id,
+            "username": row.author_username,
+            "github_username": row.author_github_username,
+            "avatar_url": row.author_avatar_url,
+            "bio": row.author_bio
+        }
+    }
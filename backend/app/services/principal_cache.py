@@ -0,0 +1,145 @@
+"""
+Short-lived cache of authenticated users, so authenticated requests do not
+load their users row every time.
+
+Entries are keyed by (user_id, token_version) and hold the user's column
+values except VOLATILE_COLUMNS, which change outside the ORM (notification
+counters) and are loaded from the database only when a request reads them.
+Each request gets its own User instance attached to its session without a
+SELECT, so endpoints can keep modifying current_user as before.
+
+Entries expire after PRINCIPAL_CACHE_TTL_SECONDS, the least recently used
+are evicted above PRINCIPAL_CACHE_SIZE, and a user's entries are dropped
+when a session in this worker commits a change to that user. Other workers
+pick up such changes within the TTL.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models import User
+
+VOLATILE_COLUMNS = ("unread_notifications", "notifications_version")
+_CHANGED_KEY = "changed_user_ids"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated identity from a verified token; the users row is only loaded by resolve()"""
+    id: str
+    token_version: int = 0
+
+    def resolve(self, db: Session) -> Optional[User]:
+        return principal_cache.load(db, self.id, self.token_version)
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, dict]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}  # token_version of each user's latest cached entry
+        self._columns = [
+            attr.key for attr in inspect(User).column_attrs if attr.key not in VOLATILE_COLUMNS
+        ]
+
+    def load(self, db: Session, user_id: str, token_version: int = 0) -> Optional[User]:
+        """The user attached to db, or None if it does not exist or the token version was revoked"""
+        key = (user_id, token_version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                values = entry[1]
+            else:
+                values = None
+                if entry is not None:
+                    self._remove(key)
+
+        if values is not None:
+            metrics.incr("principal_cache.hits")
+            return self._attach(db, values)
+
+        metrics.incr("principal_cache.misses")
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None or (user.token_version or 0) != token_version:
+            return None
+
+        values = {name: getattr(user, name) for name in self._columns}
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, copy.deepcopy(values))
+            self._entries.move_to_end(key)
+            self._versions[user_id] = token_version
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+        return user
+
+    def _remove(self, key: Tuple[str, int]) -> None:
+        del self._entries[key]
+        if self._versions.get(key[0]) == key[1]:
+            del self._versions[key[0]]
+
+    def is_revoked(self, user_id: str, token_version: int = 0) -> bool:
+        """
+        Whether a live entry shows the user's tokens are past token_version.
+        Only answers from this worker's cache, without a query: a token
+        revoked while the user has no entry here is not detected.
+        """
+        with self._lock:
+            version = self._versions.get(user_id)
+        return version is not None and version != token_version
+
+    def _attach(self, db: Session, values: dict) -> User:
+        user = User(**copy.deepcopy(values))
+        make_transient_to_detached(user)
+        db.add(user)
+        # Not cached; read from the database on first access
+        db.expire(user, list(VOLATILE_COLUMNS))
+        return user
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+            self._versions.pop(user_id, None)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=settings.PRINCIPAL_CACHE_SIZE
+)
+metrics.register_gauge("principal_cache.size", principal_cache.size)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_users(session: Session, flush_context, instances) -> None:
+    changed = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False)
+    ]
+    changed += [obj.id for obj in session.deleted if isinstance(obj, User)]
+    if changed:
+        session.info.setdefault(_CHANGED_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_KEY, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,82 @@
+from typing import Dict, Iterable, Optional
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from app.models import Follow, PostLike
+
+
+class RelationshipResolver:
+    """
+    Resolves follow relationships between a viewer and many users.
+
+    Create one per request: lookups for all target ids are answered by a
+    single IN query and memoized, so later checks never hit the database.
+    Post likes by the viewer are resolved the same way.
+    """
+
+    def __init__(self, db: Session, viewer_id: Optional[str]):
+        self.db = db
+        self.viewer_id = viewer_id
+        self._following: Dict[str, bool] = {}  # viewer -> target
+        self._followed_by: Dict[str, bool] = {}  # target -> viewer
+        self._liked: Dict[str, bool] = {}  # post -> liked by viewer
+
+    def prefetch(self, user_ids: Iterable[str]) -> None:
+        """Load relationships for every id not resolved yet in one query"""
+        missing = {uid for uid in user_ids if uid not in self._following}
+        if not missing:
+            return
+
+        for uid in missing:
+            self._following[uid] = False
+            self._followed_by[uid] = False
+
+        if self.viewer_id is None:
+            return
+
+        rows = self.db.query(Follow.follower_id, Follow.following_id).filter(
+            or_(
+                and_(Follow.follower_id == self.viewer_id, Follow.following_id.in_(missing)),
+                and_(Follow.following_id == self.viewer_id, Follow.follower_id.in_(missing)),
+            )
+        ).all()
+
+        for follower_id, following_id in rows:
+            if follower_id == self.viewer_id:
+                self._following[following_id] = True
+            if following_id == self.viewer_id:
+                self._followed_by[follower_id] = True
+
+    def is_following(self, user_id: str) -> bool:
+        """Whether the viewer follows user_id"""
+        self.prefetch([user_id])
+        return self._following[user_id]
+
+    def follows_you(self, user_id: str) -> bool:
+        """Whether user_id follows the viewer"""
+        self.prefetch([user_id])
+        return self._followed_by[user_id]
+
+    def prefetch_likes(self, post_ids: Iterable[str]) -> None:
+        """Load the viewer's likes for every post not resolved yet in one query"""
+        missing = {pid for pid in post_ids if pid not in self._liked}
+        if not missing:
+            return
+
+        for pid in missing:
+            self._liked[pid] = False
+
+        if self.viewer_id is None:
+            return
+
+        rows = self.db.query(PostLike.post_id).filter(
+            PostLike.user_id == self.viewer_id,
+            PostLike.post_id.in_(missing)
+        ).all()
+
+        for (post_id,) in rows:
+            self._liked[post_id] = True
+
+    def has_liked(self, post_id: str) -> bool:
+        """Whether the viewer liked post_id"""
+        self.prefetch_likes([post_id])
+        return self._liked[post_id]
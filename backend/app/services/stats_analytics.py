@@ -0,0 +1,134 @@
+"""
+Server-side analytics for the stats history charts.
+
+The user's daily rollup rows and the view arrays of all of their posts are
+loaded once and turned into NumPy arrays, so moving averages, period growth
+and per-post percentile ranks are computed as whole-array operations
+instead of per-day or per-post Python loops.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import BlogPost, PostLike, PostView, UserDailyStats
+from app.services.view_history import month_of, DAYS_PER_ROW
+
+METRICS = ("views", "unique_views", "likes", "comments", "follows")
+WINDOWS = (7, 28)
+
+
+def lookback_days(days: int) -> int:
+    """Days of history needed before the range: a previous period and the widest window"""
+    return max(days, max(WINDOWS) - 1)
+
+
+def _moving_average(series: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over window days; series must start window - 1 days early"""
+    totals = np.cumsum(np.concatenate(([0], series)))
+    return (totals[window:] - totals[:-window]) / window
+
+
+def _growth(current: int, previous: int) -> Optional[float]:
+    if previous == 0:
+        return None
+    return round((current - previous) / previous, 4)
+
+
+def _percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Percentile rank (0-100) of each value among values; ties share the mean rank"""
+    if values.size == 0:
+        return values.astype(float)
+    ordered = np.sort(values)
+    below = np.searchsorted(ordered, values, side="left")
+    at_or_below = np.searchsorted(ordered, values, side="right")
+    return (below + at_or_below) / 2 / values.size * 100
+
+
+def series_analytics(rows: List[UserDailyStats], first: date, start: date, end: date) -> Dict[str, dict]:
+    """
+    Moving averages and growth for each metric over start..end.
+    rows are the user's rollup rows from first (at least lookback_days
+    before start) through end.
+    """
+    length = (end - first).days + 1
+    offset = (start - first).days
+    days = length - offset
+
+    positions = np.array([(row.date - first).days for row in rows], dtype=np.int64)
+    result = {}
+    for metric in METRICS:
+        series = np.zeros(length, dtype=np.int64)
+        series[positions] = [getattr(row, metric) for row in rows]
+
+        current = int(series[offset:].sum())
+        previous = int(series[max(offset - days, 0):offset].sum())
+        analytics = {"total": current, "previous_total": previous, "growth": _growth(current, previous)}
+        for window in WINDOWS:
+            average = _moving_average(series[offset - window + 1:], window)
+            analytics[f"ma{window}"] = np.round(average, 2).tolist()
+        result[metric] = analytics
+    return result
+
+
+def post_percentiles(db: Session, user_id: str, start: date, end: date) -> List[dict]:
+    """Views and likes of each published post over start..end with their percentile ranks among the user's posts"""
+    posts = db.query(BlogPost.id, BlogPost.title).filter(
+        BlogPost.user_id == user_id,
+        BlogPost.status == "published"
+    ).all()
+    if not posts:
+        return []
+    index = {post.id: i for i, post in enumerate(posts)}
+
+    # Every monthly view row of the user's posts that overlaps the range
+    view_rows = db.query(PostView.post_id, PostView.month, PostView.daily_views).join(
+        BlogPost, BlogPost.id == PostView.post_id
+    ).filter(
+        BlogPost.user_id == user_id,
+        BlogPost.status == "published",
+        PostView.month >= month_of(start),
+        PostView.month <= end
+    ).all()
+
+    views = np.zeros(len(posts), dtype=np.int64)
+    if view_rows:
+        months = np.array([row.month for row in view_rows], dtype="datetime64[D]")
+        counts = np.array([row.daily_views for row in view_rows], dtype=np.int64)
+        dates = months[:, None] + np.arange(DAYS_PER_ROW)
+        in_range = (
+            (dates >= np.datetime64(start))
+            & (dates <= np.datetime64(end))
+            # Slots past the end of a short month belong to no day
+            & (dates.astype("datetime64[M]") == months.astype("datetime64[M]")[:, None])
+        )
+        rows_of = np.array([index[row.post_id] for row in view_rows], dtype=np.int64)
+        views = np.bincount(rows_of, weights=np.where(in_range, counts, 0).sum(axis=1), minlength=len(posts))
+        views = views.astype(np.int64)
+
+    likes = np.zeros(len(posts), dtype=np.int64)
+    like_counts = db.query(PostLike.post_id, func.count()).join(
+        BlogPost, BlogPost.id == PostLike.post_id
+    ).filter(
+        BlogPost.user_id == user_id,
+        BlogPost.status == "published",
+        PostLike.created_at >= start,
+        PostLike.created_at < end + timedelta(days=1)
+    ).group_by(PostLike.post_id).all()
+    if like_counts:
+        likes[[index[post_id] for post_id, _ in like_counts]] = [count for _, count in like_counts]
+
+    views_rank = np.round(_percentile_ranks(views), 1)
+    likes_rank = np.round(_percentile_ranks(likes), 1)
+    order = np.argsort(-views, kind="stable")
+    return [
+        {
+            "post_id": posts[i].id,
+            "title": posts[i].title,
+            "views": int(views[i]),
+            "likes": int(likes[i]),
+            "views_percentile": float(views_rank[i]),
+            "likes_percentile": float(likes_rank[i]),
+        }
+        for i in order
+    ]
@@ -0,0 +1,192 @@
+"""
+Home timeline ("following" feed) maintenance.
+
+Published posts are pushed into each follower's timeline_entries rows
+(fan-out-on-write) by the background fan-out worker, so publishing does not
+wait on it. Authors with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers
+are flagged fanout_on_read instead, and their posts are merged into the
+timeline when it is read; the flag is cleared again when their follower
+count drops back under the limit.
+"""
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import select, delete, func, literal, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import User, BlogPost, Follow, TimelineEntry
+from app.services.post_queries import post_cards_select
+
+
+def trim_timelines(db: Session, user_ids: List[str]) -> None:
+    """Keep only the newest TIMELINE_MAX_LENGTH entries for each user"""
+    ranked = select(
+        TimelineEntry.user_id,
+        TimelineEntry.post_id,
+        func.row_number().over(
+            partition_by=TimelineEntry.user_id,
+            order_by=(TimelineEntry.published_at.desc(), TimelineEntry.post_id.desc()),
+        ).label("rn"),
+    ).where(TimelineEntry.user_id.in_(user_ids)).subquery()
+
+    overflow = select(ranked.c.user_id, ranked.c.post_id).where(ranked.c.rn > settings.TIMELINE_MAX_LENGTH)
+
+    db.execute(
+        delete(TimelineEntry).where(
+            tuple_(TimelineEntry.user_id, TimelineEntry.post_id).in_(overflow)
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def fan_out_chunk(db: Session, post: BlogPost, last_follower_id: str) -> List[str]:
+    """
+    Push a published post into the timelines of the author's next
+    TIMELINE_FANOUT_CHUNK_SIZE followers after last_follower_id, called
+    chunk by chunk from the fan-out worker (notification_fanout).
+    Returns the followers reached; a short chunk is the last one.
+
+    The first chunk decides the author's mode from the follower count.
+    Authors above TIMELINE_FANOUT_MAX_FOLLOWERS become fanout_on_read and
+    nothing is pushed. A fanout_on_read author back under the limit stays
+    merged on read while their recent posts are backfilled into every
+    follower's timeline, and is switched back after the last chunk.
+    """
+    author = db.query(User).filter(User.id == post.user_id).first()
+    if author is None:
+        return []
+
+    if not last_follower_id:
+        followers_count = db.query(func.count(Follow.id)).filter(
+            Follow.following_id == author.id
+        ).scalar()
+        if followers_count > settings.TIMELINE_FANOUT_MAX_FOLLOWERS:
+            author.fanout_on_read = True
+            return []
+
+    follower_ids = [
+        row.follower_id for row in db.query(Follow.follower_id).filter(
+            Follow.following_id == author.id,
+            Follow.follower_id > last_follower_id
+        ).order_by(Follow.follower_id).limit(settings.TIMELINE_FANOUT_CHUNK_SIZE).all()
+    ]
+
+    if author.fanout_on_read:
+        posts = db.query(BlogPost.id, BlogPost.published_at).filter(
+            BlogPost.user_id == author.id,
+            BlogPost.status == "published",
+            BlogPost.published_at.isnot(None)
+        ).order_by(BlogPost.published_at.desc()).limit(settings.TIMELINE_FOLLOW_BACKFILL).all()
+    else:
+        posts = [(post.id, post.published_at or datetime.utcnow())]
+
+    if follower_ids and posts:
+        db.execute(
+            insert(TimelineEntry).values([
+                {
+                    "user_id": follower_id,
+                    "post_id": post_id,
+                    "author_id": author.id,
+                    "published_at": published_at,
+                }
+                for follower_id in follower_ids
+                for post_id, published_at in posts
+            ]).on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+        )
+        trim_timelines(db, follower_ids)
+
+    if author.fanout_on_read and len(follower_ids) < settings.TIMELINE_FANOUT_CHUNK_SIZE:
+        # Every follower has the author's recent posts pushed now
+        author.fanout_on_read = False
+
+    return follower_ids
+
+
+def remove_post(db: Session, post_id: str) -> None:
+    """Remove an unpublished post from every timeline"""
+    db.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.post_id == post_id
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def backfill_follow(db: Session, follower_id: str, author_id: str) -> None:
+    """Seed a new follower's timeline with the author's recent posts"""
+    author = db.query(User).filter(User.id == author_id).first()
+    if author is None or author.fanout_on_read:
+        return
+
+    recent = select(
+        literal(follower_id).label("user_id"),
+        BlogPost.id,
+        BlogPost.user_id,
+        BlogPost.published_at,
+    ).where(
+        BlogPost.user_id == author_id,
+        BlogPost.status == "published",
+        BlogPost.published_at.isnot(None),
+    ).order_by(BlogPost.published_at.desc()).limit(settings.TIMELINE_FOLLOW_BACKFILL)
+
+    db.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "post_id", "author_id", "published_at"], recent
+        ).on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+    )
+    trim_timelines(db, [follower_id])
+
+
+def remove_follow(db: Session, follower_id: str, author_id: str) -> None:
+    """Drop an unfollowed author's posts from the follower's timeline"""
+    db.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.user_id == follower_id,
+            TimelineEntry.author_id == author_id
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def read_timeline(db: Session, user_id: str, key: Optional[tuple], limit: int) -> list:
+    """
+    Up to `limit` post card rows (see post_cards_select) older than `key`, newest first.
+    Merges pushed timeline entries with posts from followed fanout_on_read authors.
+    """
+    def page(stmt, published_at, post_id):
+        if key is not None:
+            stmt = stmt.where(tuple_(published_at, post_id) < tuple_(*key))
+        return db.execute(stmt.order_by(published_at.desc(), post_id.desc()).limit(limit)).all()
+
+    # Ordered on timeline_entries columns so ix_timeline_entries_user_published is used
+    pushed = page(
+        post_cards_select().join(
+            TimelineEntry, TimelineEntry.post_id == BlogPost.id
+        ).where(
+            TimelineEntry.user_id == user_id,
+            BlogPost.status == "published",
+            User.is_active == True
+        ),
+        TimelineEntry.published_at,
+        TimelineEntry.post_id,
+    )
+
+    pulled_authors = select(Follow.following_id).join(
+        User, Follow.following_id == User.id
+    ).where(
+        Follow.follower_id == user_id,
+        User.fanout_on_read == True
+    )
+    pulled = page(
+        post_cards_select().where(
+            BlogPost.user_id.in_(pulled_authors),
+            BlogPost.status == "published",
+            User.is_active == True
+        ),
+        BlogPost.published_at,
+        BlogPost.id,
+    )
+
+    merged = {row.id: row for row in pushed}
+    for row in pulled:
+        merged.setdefault(row.id, row)
+
+    rows = sorted(merged.values(), key=lambda row: (row.published_at, row.id), reverse=True)
+    return rows[:limit]
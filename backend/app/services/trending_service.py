@@ -0,0 +1,99 @@
+import math
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, union, union_all, literal, func, extract, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import PostView, PostLike, PostTrendingScore
+from app.services.view_history import daily_views_select
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(value: datetime) -> float:
+    return (value - EPOCH).total_seconds()
+
+
+def refresh_trending_scores(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Incrementally refresh post_trending_scores.
+
+    Each view or like in the window contributes weight * exp(-(now - t) / tau).
+    The score is stored in log space with a fixed epoch offset,
+
+        score = ln(sum(w * exp((t - now) / tau))) + now / tau
+
+    which is equal to ln(sum(w * exp(t / tau))). Decay therefore shifts every
+    score by the same amount over time and the ranking of untouched posts never
+    goes stale, so only posts with activity since the last run (less
+    TRENDING_REFRESH_OVERLAP_SECONDS) are recomputed.
+    Posts whose last activity has left the window are dropped.
+    """
+    now = now or datetime.utcnow()
+    window_start = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    tau = settings.TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+    now_epoch = _epoch_seconds(now)
+
+    # Views and likes are stamped when their transaction starts, so ones that
+    # committed during or just after the previous run can carry an older
+    # timestamp; re-scoring the posts of an overlap window catches them
+    last_run = db.query(func.max(PostTrendingScore.computed_at)).scalar()
+    if last_run:
+        last_run -= timedelta(seconds=settings.TRENDING_REFRESH_OVERLAP_SECONDS)
+    since = max(last_run, window_start) if last_run else window_start
+
+    # Posts with new activity since the previous refresh
+    dirty = union(
+        select(PostView.post_id).where(PostView.updated_at >= since),
+        select(PostLike.post_id).where(PostLike.created_at >= since),
+    ).subquery()
+    dirty_ids = select(dirty.c.post_id)
+
+    daily_views = daily_views_select(window_start.date()).where(PostView.post_id.in_(dirty_ids)).subquery()
+    events = union_all(
+        select(
+            daily_views.c.post_id.label("post_id"),
+            daily_views.c.view_date.label("t"),
+            (daily_views.c.views * settings.TRENDING_VIEW_WEIGHT).label("w"),
+        ).where(
+            daily_views.c.view_date >= window_start,
+        ),
+        select(
+            PostLike.post_id.label("post_id"),
+            PostLike.created_at.label("t"),
+            literal(settings.TRENDING_LIKE_WEIGHT).label("w"),
+        ).where(
+            PostLike.created_at >= window_start,
+            PostLike.post_id.in_(dirty_ids),
+        ),
+    ).subquery()
+
+    decay = func.exp((extract("epoch", events.c.t) - now_epoch) / tau)
+    scores = select(
+        events.c.post_id,
+        (func.ln(func.sum(events.c.w * decay)) + now_epoch / tau).label("score"),
+        func.max(events.c.t).label("last_activity_at"),
+        literal(now).label("computed_at"),
+    ).group_by(events.c.post_id)
+
+    stmt = insert(PostTrendingScore).from_select(
+        ["post_id", "score", "last_activity_at", "computed_at"], scores
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PostTrendingScore.post_id],
+        set_={
+            "score": stmt.excluded.score,
+            "last_activity_at": stmt.excluded.last_activity_at,
+            "computed_at": stmt.excluded.computed_at,
+        },
+    )
+    updated = db.execute(stmt).rowcount
+
+    expired = db.execute(
+        delete(PostTrendingScore).where(PostTrendingScore.last_activity_at < window_start)
+    ).rowcount
+
+    db.commit()
+
+    return {"updated": updated, "expired": expired, "since": since}
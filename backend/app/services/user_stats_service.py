@@ -0,0 +1,143 @@
+"""
+Incrementally maintained per-user totals (user_stats).
+
+Write paths call bump() or bump_many() in their own transaction with the
+change they made, e.g. a like adds 1 to the author's likes_received and the
+liker's likes_given. Each call is a single upsert that adds the deltas in
+SQL, so concurrent writers never lose updates. recompute_user_stats()
+rebuilds every row from the source tables to repair drift, for example from
+cascading deletes of whole accounts.
+"""
+from typing import Dict, List
+from sqlalchemy import select, func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import User, BlogPost, PostLike, Follow, UserStatsRollup, PostCounterShard
+from app.services import post_counters
+
+COUNTERS = (
+    "posts_count",
+    "views_count",
+    "unique_views_count",
+    "likes_received",
+    "comments_received",
+    "likes_given",
+    "followers_count",
+    "following_count",
+)
+
+
+def bump_many(db: Session, deltas: List[Dict[str, int]]) -> None:
+    """
+    Apply counter deltas; each dict has user_id plus any COUNTERS keys.
+    Rows are created on first use and counters never drop below zero.
+    """
+    # One row per user: an upsert cannot touch the same row twice
+    merged: Dict[str, Dict[str, int]] = {}
+    for d in deltas:
+        row = merged.setdefault(d["user_id"], {name: 0 for name in COUNTERS})
+        for name in COUNTERS:
+            row[name] += d.get(name, 0)
+
+    # Sorted so concurrent upserts lock rows in the same order
+    rows = [
+        {"user_id": user_id, **counters}
+        for user_id, counters in sorted(merged.items())
+        if any(counters.values())
+    ]
+    if not rows:
+        return
+
+    stmt = insert(UserStatsRollup).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserStatsRollup.user_id],
+        set_={
+            **{
+                name: func.greatest(getattr(UserStatsRollup, name) + getattr(stmt.excluded, name), 0)
+                for name in COUNTERS
+            },
+            "updated_at": func.now(),
+        },
+    ))
+
+
+def bump(db: Session, user_id: str, **deltas: int) -> None:
+    """Apply counter deltas for one user"""
+    bump_many(db, [{"user_id": user_id, **deltas}])
+
+
+def get_user_stats(db: Session, user_id: str) -> Dict[str, int]:
+    """Counters for user_id by primary key; zeros when the user has no row yet"""
+    row = db.get(UserStatsRollup, user_id)
+    return {name: (getattr(row, name) or 0) if row else 0 for name in COUNTERS}
+
+
+def _computed_stats():
+    """SELECT of every user's counters computed from the source tables"""
+    # Changes of hot posts not yet folded back into blog_posts
+    shards = select(
+        PostCounterShard.post_id,
+        *[func.sum(getattr(PostCounterShard, name)).label(name) for name in post_counters.COUNTERS]
+    ).group_by(PostCounterShard.post_id).subquery()
+
+    def post_total(name):
+        return func.coalesce(func.sum(
+            func.coalesce(getattr(BlogPost, name), 0) + func.coalesce(shards.c[name], 0)
+        ), 0)
+
+    posts = select(
+        BlogPost.user_id,
+        func.count(BlogPost.id).filter(BlogPost.status == "published").label("posts_count"),
+        post_total("view_count").label("views_count"),
+        post_total("unique_views").label("unique_views_count"),
+        post_total("likes_count").label("likes_received"),
+        post_total("comments_count").label("comments_received"),
+    ).outerjoin(shards, shards.c.post_id == BlogPost.id).group_by(BlogPost.user_id).subquery()
+    likes_given = select(
+        PostLike.user_id, func.count(PostLike.id).label("likes_given")
+    ).group_by(PostLike.user_id).subquery()
+    followers = select(
+        Follow.following_id.label("user_id"), func.count(Follow.id).label("followers_count")
+    ).group_by(Follow.following_id).subquery()
+    following = select(
+        Follow.follower_id.label("user_id"), func.count(Follow.id).label("following_count")
+    ).group_by(Follow.follower_id).subquery()
+
+    return select(
+        User.id.label("user_id"),
+        func.coalesce(posts.c.posts_count, 0),
+        func.coalesce(posts.c.views_count, 0),
+        func.coalesce(posts.c.unique_views_count, 0),
+        func.coalesce(posts.c.likes_received, 0),
+        func.coalesce(posts.c.comments_received, 0),
+        func.coalesce(likes_given.c.likes_given, 0),
+        func.coalesce(followers.c.followers_count, 0),
+        func.coalesce(following.c.following_count, 0),
+        func.now(),
+    ).select_from(User).outerjoin(
+        posts, posts.c.user_id == User.id
+    ).outerjoin(
+        likes_given, likes_given.c.user_id == User.id
+    ).outerjoin(
+        followers, followers.c.user_id == User.id
+    ).outerjoin(
+        following, following.c.user_id == User.id
+    )
+
+
+def recompute_user_stats(db: Session) -> int:
+    """
+    Rebuild user_stats from the source tables in one set-based upsert.
+    Returns the number of rows that were missing or wrong.
+    """
+    stmt = insert(UserStatsRollup).from_select(["user_id", *COUNTERS, "updated_at"], _computed_stats())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStatsRollup.user_id],
+        set_={**{name: getattr(stmt.excluded, name) for name in COUNTERS}, "updated_at": func.now()},
+        # Only touch rows that actually drifted
+        where=or_(*[
+            getattr(UserStatsRollup, name).is_distinct_from(getattr(stmt.excluded, name))
+            for name in COUNTERS
+        ]),
+    )
+    return db.execute(stmt).rowcount
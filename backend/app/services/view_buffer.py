@@ -0,0 +1,255 @@
+"""
+Write-behind buffer for post view counts.
+
+Post reads only record a view in memory. A background thread flushes the
+accumulated (post_id, day) counts every VIEW_BUFFER_FLUSH_SECONDS. Per day,
+one UPDATE adds the counts in place to that day's slot of the monthly
+post_views arrays; then one set-based UPDATE of blog_posts.view_count
+(post_counters.add_many, which shards hot posts) and one upsert of the
+authors' user_stats follow.
+
+Each (post_id, day) also keeps a HyperLogLog sketch of viewer keys, merged
+into post_view_sketches on flush to estimate unique viewers. Sketches are
+kept for SKETCH_RETENTION_DAYS past the day, after which the day's estimate
+in post_views is final.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import update, delete, values, column, func, String, Integer
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models import BlogPost, PostView, PostViewSketch
+from app.models.base import SessionLocal
+from app.services import user_stats_service, post_counters
+from app.services.view_history import month_of, empty_month
+from app.utils.hyperloglog import HyperLogLog
+
+# Days after a view date its sketch is kept, for views flushed after midnight
+SKETCH_RETENTION_DAYS = 1
+
+
+class ViewCounterBuffer:
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counts: Dict[Tuple[str, datetime], int] = {}
+        self._sketches: Dict[Tuple[str, datetime], HyperLogLog] = {}
+        self._per_post: Dict[str, int] = {}
+        self._oldest_pending: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, post_id: str, day: datetime, viewer_key: Optional[str] = None, count: int = 1) -> None:
+        """
+        Count a view of post_id on day (truncated to midnight).
+        viewer_key identifies the viewer for unique counting; crawlers pass None.
+        """
+        with self._lock:
+            key = (post_id, day)
+            self._counts[key] = self._counts.get(key, 0) + count
+            if viewer_key is not None:
+                sketch = self._sketches.get(key)
+                if sketch is None:
+                    sketch = self._sketches[key] = HyperLogLog()
+                sketch.add(viewer_key)
+            self._per_post[post_id] = self._per_post.get(post_id, 0) + count
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+
+    def pending_for(self, post_id: str) -> int:
+        """Views of post_id recorded but not flushed yet"""
+        with self._lock:
+            return self._per_post.get(post_id, 0)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(self._per_post.values())
+
+    def lag_seconds(self) -> float:
+        """Age of the oldest view that has not been flushed"""
+        with self._lock:
+            if self._oldest_pending is None:
+                return 0.0
+            return time.monotonic() - self._oldest_pending
+
+    def flush(self) -> int:
+        """Write buffered counts to the database; returns the number of views flushed"""
+        with self._flush_lock:
+            with self._lock:
+                counts = self._counts
+                sketches = self._sketches
+                oldest_pending = self._oldest_pending
+                self._counts = {}
+                self._sketches = {}
+                self._per_post = {}
+                self._oldest_pending = None
+
+            if not counts:
+                return 0
+
+            db = SessionLocal()
+            try:
+                with metrics.timer("view_buffer.flush_seconds"):
+                    self._write(db, counts, sketches)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                # Put the counts back so they are retried on the next flush
+                with self._lock:
+                    for (post_id, day), count in counts.items():
+                        key = (post_id, day)
+                        self._counts[key] = self._counts.get(key, 0) + count
+                        self._per_post[post_id] = self._per_post.get(post_id, 0) + count
+                    for key, sketch in sketches.items():
+                        if key in self._sketches:
+                            sketch.merge(self._sketches[key])
+                        self._sketches[key] = sketch
+                    if self._oldest_pending is None or oldest_pending < self._oldest_pending:
+                        self._oldest_pending = oldest_pending
+                metrics.incr("view_buffer.flush_errors")
+                print(f"[{datetime.utcnow()}] Failed to flush view counts: {str(e)}")
+                return 0
+            finally:
+                db.close()
+
+            flushed = sum(counts.values())
+            metrics.incr("view_buffer.flushed_views", flushed)
+            return flushed
+
+    def _write(
+        self,
+        db,
+        counts: Dict[Tuple[str, datetime], int],
+        sketches: Dict[Tuple[str, datetime], HyperLogLog],
+    ) -> None:
+        # Drop views of posts deleted since they were read; they would violate the FK
+        authors = {
+            row.id: row.user_id for row in db.query(BlogPost.id, BlogPost.user_id).filter(
+                BlogPost.id.in_({post_id for post_id, _ in counts})
+            ).all()
+        }
+        counts = {key: count for key, count in counts.items() if key[0] in authors}
+        if not counts:
+            return
+
+        by_day: Dict[date, Dict[str, int]] = {}
+        for (post_id, day), count in counts.items():
+            by_day.setdefault(day.date(), {})[post_id] = count
+
+        unique_deltas: Dict[str, int] = {}
+        for day, day_counts in sorted(by_day.items()):
+            day_unique = self._merge_sketches(db, day, {
+                post_id: sketches[(post_id, key)] for (post_id, key) in sketches
+                if key.date() == day and post_id in day_counts
+            })
+            for post_id, delta in day_unique.items():
+                unique_deltas[post_id] = unique_deltas.get(post_id, 0) + delta
+
+            # Make sure every (post, month) row exists, then add to the day's
+            # array slot in place
+            month = month_of(day)
+            db.execute(insert(PostView).values([
+                {"post_id": post_id, "month": month, "daily_views": empty_month(), "daily_unique_views": empty_month()}
+                for post_id in day_counts
+            ]).on_conflict_do_nothing(index_elements=[PostView.post_id, PostView.month]))
+
+            slot = day.day
+            deltas = values(
+                column("post_id", String), column("delta", Integer), column("unique_delta", Integer), name="deltas"
+            ).data([(post_id, count, day_unique.get(post_id, 0)) for post_id, count in day_counts.items()])
+            db.execute(
+                update(PostView).where(
+                    PostView.post_id == deltas.c.post_id,
+                    PostView.month == month
+                ).values({
+                    PostView.daily_views[slot]: PostView.daily_views[slot] + deltas.c.delta,
+                    PostView.daily_unique_views[slot]: PostView.daily_unique_views[slot] + deltas.c.unique_delta,
+                    PostView.updated_at: func.now(),
+                }).execution_options(synchronize_session=False)
+            )
+
+        # Sketches are only needed while a day can still get views
+        db.execute(delete(PostViewSketch).where(
+            PostViewSketch.view_date < date.today() - timedelta(days=SKETCH_RETENTION_DAYS)
+        ))
+
+        per_post: Dict[str, int] = {}
+        for (post_id, _), count in counts.items():
+            per_post[post_id] = per_post.get(post_id, 0) + count
+
+        post_counters.add_many(db, {
+            post_id: {"view_count": delta, "unique_views": unique_deltas.get(post_id, 0)}
+            for post_id, delta in per_post.items()
+        })
+
+        user_stats_service.bump_many(db, [
+            {"user_id": authors[post_id], "views_count": delta, "unique_views_count": unique_deltas.get(post_id, 0)}
+            for post_id, delta in per_post.items()
+        ])
+
+    def _merge_sketches(self, db, day: date, sketches: Dict[str, HyperLogLog]) -> Dict[str, int]:
+        """Merge sketches into the stored ones for day; returns the change in each post's estimate"""
+        if not sketches:
+            return {}
+
+        # Make sure every (post, day) sketch exists, then lock the rows so
+        # sketches can be merged without racing flushes from other workers
+        db.execute(insert(PostViewSketch).values([
+            {"post_id": post_id, "view_date": day, "sketch": b"", "unique_views": 0}
+            for post_id in sketches
+        ]).on_conflict_do_nothing(index_elements=[PostViewSketch.post_id, PostViewSketch.view_date]))
+
+        stored = db.query(
+            PostViewSketch.post_id, PostViewSketch.sketch, PostViewSketch.unique_views
+        ).filter(
+            PostViewSketch.post_id.in_(list(sketches)),
+            PostViewSketch.view_date == day
+        ).with_for_update().all()
+
+        rows = []
+        unique_deltas: Dict[str, int] = {}
+        for post_id, stored_sketch, stored_unique in stored:
+            sketch = sketches[post_id]
+            sketch.merge(HyperLogLog.from_bytes(stored_sketch))
+            estimate = sketch.count()
+            unique_deltas[post_id] = estimate - (stored_unique or 0)
+            rows.append({"post_id": post_id, "view_date": day, "sketch": sketch.to_bytes(), "unique_views": estimate})
+
+        stmt = insert(PostViewSketch).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[PostViewSketch.post_id, PostViewSketch.view_date],
+            set_={
+                "sketch": stmt.excluded.sketch,
+                "unique_views": stmt.excluded.unique_views,
+            },
+        ))
+        return unique_deltas
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="view-buffer-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and write whatever is still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+view_buffer = ViewCounterBuffer(flush_interval=settings.VIEW_BUFFER_FLUSH_SECONDS)
+metrics.register_gauge("view_buffer.lag_seconds", view_buffer.lag_seconds)
+metrics.register_gauge("view_buffer.pending_views", view_buffer.pending_count)
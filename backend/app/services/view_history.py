@@ -0,0 +1,68 @@
+"""
+Reading daily view counts out of the monthly post_views arrays.
+
+post_views keeps one row per (post_id, month) with integer[31] arrays of
+daily views and unique viewer estimates; slot d (1-based, as in Postgres)
+is day d of the month, and slots past the end of a short month stay 0.
+"""
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import cast, func, select, true, Integer
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from app.models import PostView
+
+DAYS_PER_ROW = 31
+
+
+def month_of(day: date) -> date:
+    """First day of day's month, the post_views row key"""
+    return day.replace(day=1)
+
+
+def empty_month() -> list:
+    return [0] * DAYS_PER_ROW
+
+
+def daily_views_select(start: date, end: Optional[date] = None) -> Select:
+    """
+    SELECT post_id, view_date, views, unique_views for every day from start
+    (through end) that has views, unnesting the monthly arrays
+    """
+    slots = func.unnest(PostView.daily_views, PostView.daily_unique_views).table_valued(
+        "views", "unique_views", with_ordinality="day"
+    ).render_derived(name="slots")
+    # WITH ORDINALITY is bigint and Postgres only has date + integer
+    day_date = PostView.month + (cast(slots.c.day, Integer) - 1)
+    view_date = day_date.label("view_date")
+
+    query = select(
+        PostView.post_id, view_date, slots.c.views, slots.c.unique_views
+    ).select_from(PostView).join(slots, true()).where(
+        PostView.month >= month_of(start),
+        day_date >= start,
+        slots.c.views > 0,
+    )
+    if end is not None:
+        query = query.where(
+            PostView.month <= end,
+            day_date <= end,
+        )
+    return query
+
+
+def post_view_history(db: Session, post_id: str, start: date, end: date) -> Dict[date, Tuple[int, int]]:
+    """(views, unique_views) by day for one post, sliced from its monthly rows"""
+    rows = db.query(PostView.month, PostView.daily_views, PostView.daily_unique_views).filter(
+        PostView.post_id == post_id,
+        PostView.month >= month_of(start),
+        PostView.month <= end
+    ).all()
+
+    history: Dict[date, Tuple[int, int]] = {}
+    for month, views, unique_views in rows:
+        for index, count in enumerate(views):
+            day = month + timedelta(days=index)
+            if count and day.month == month.month and start <= day <= end:
+                history[day] = (count, unique_views[index])
+    return history
@@ -0,0 +1,36 @@
+"""
+Opaque keyset cursors for list endpoints.
+
+A cursor encodes the sort key of the last row a client has seen, so the next
+page is fetched with a row-value comparison instead of an OFFSET scan.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+
+def encode_cursor(mode: str, values: List[Any]) -> str:
+    """Encode a sort mode and the last row's sort key into an opaque token"""
+    key = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps({"m": mode, "k": key}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], List[Any]]:
+    """
+    Decode a token produced by encode_cursor.
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        mode = data["m"]
+        key = data["k"]
+    except (ValueError, TypeError, KeyError, UnicodeEncodeError) as e:
+        raise ValueError("Malformed cursor") from e
+
+    if not isinstance(key, list):
+        raise ValueError("Malformed cursor")
+
+    return mode, key
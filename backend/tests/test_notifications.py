@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from app.api.v1.endpoints.notifications import create_notification, get_notifications, retract_notification
+from app.core.config import settings
+from app.models import Comment, Follow, Notification, NotificationActor, User
+
+
+def _notify(db, recipient, make_user, make_post, count):
+    """count notifications of mixed types from distinct actors, each with its own post and comment"""
+    now = datetime.utcnow()
+    for i in range(count):
+        actor = make_user()
+        post = make_post(recipient)
+        comment = Comment(user_id=actor.id, post_id=post.id, content=f"comment {i}")
+        db.add(comment)
+        db.flush()
+        if i % 3 == 0:
+            db.add(Follow(follower_id=recipient.id, following_id=actor.id))
+        notification_type, values = [
+            ("like", {"post_id": post.id}),
+            ("comment", {"post_id": post.id, "comment_id": comment.id}),
+            ("follow", {}),
+        ][i % 3]
+        db.add(Notification(
+            user_id=recipient.id, actor_id=actor.id, type=notification_type,
+            sample_actor_ids=[actor.id], created_at=now - timedelta(minutes=i), **values
+        ))
+    db.flush()
+
+
+def test_notification_page_query_count_does_not_grow_with_limit(db, make_user, make_post, query_counter):
+    recipient = make_user(unread_notifications=20)
+    _notify(db, recipient, make_user, make_post, 20)
+
+    counts = {}
+    for limit in (1, 5, 20):
+        db.expire_all()
+        current_user = db.get(type(recipient), recipient.id)
+        query_counter.reset()
+        result = get_notifications(page=1, limit=limit, unread_only=False, db=db, current_user=current_user)
+        assert len(result["notifications"]) == limit
+        counts[limit] = query_counter.count
+
+    assert counts[1] == counts[5] == counts[20], counts
+
+
+def _group(db, recipient, post):
+    db.flush()
+    db.expire_all()
+    return db.query(Notification).filter(
+        Notification.user_id == recipient.id,
+        Notification.type == "like",
+        Notification.post_id == post.id
+    ).one_or_none()
+
+
+def test_like_group_counts_each_actor_once(db, make_user, make_post):
+    recipient = make_user()
+    post = make_post(recipient)
+    actors = [make_user() for _ in range(settings.NOTIFICATION_SAMPLE_ACTORS + 1)]
+
+    for actor in actors:
+        create_notification(db, recipient.id, actor.id, "like", post_id=post.id)
+    group = _group(db, recipient, post)
+    assert group.actor_count == len(actors)
+    assert actors[0].id not in group.sample_actor_ids
+
+    # Acting again after dropping out of the sample is not a new actor
+    create_notification(db, recipient.id, actors[0].id, "like", post_id=post.id)
+    group = _group(db, recipient, post)
+    assert group.actor_count == len(actors)
+    assert group.sample_actor_ids[0] == actors[0].id
+    assert db.get(User, recipient.id).unread_notifications == 1
+
+
+def test_retracting_actors_empties_and_drops_the_group(db, make_user, make_post):
+    recipient, outsider = make_user(), make_user()
+    post = make_post(recipient)
+    actors = [make_user() for _ in range(settings.NOTIFICATION_SAMPLE_ACTORS + 2)]
+    for actor in actors:
+        create_notification(db, recipient.id, actor.id, "like", post_id=post.id)
+
+    retract_notification(db, recipient.id, outsider.id, "like", post_id=post.id)
+    assert _group(db, recipient, post).actor_count == len(actors)
+
+    for remaining, actor in reversed(list(enumerate(actors))):
+        retract_notification(db, recipient.id, actor.id, "like", post_id=post.id)
+        group = _group(db, recipient, post)
+        if remaining:
+            assert group.actor_count == remaining
+            assert actor.id not in group.sample_actor_ids
+            assert len(group.sample_actor_ids) == min(remaining, settings.NOTIFICATION_SAMPLE_ACTORS)
+
+    assert _group(db, recipient, post) is None
+    assert db.query(NotificationActor).count() == 0
+    assert db.get(User, recipient.id).unread_notifications == 0
@@ -0,0 +1,81 @@
+from datetime import date
+
+from app.models import BlogPost, Comment, PostCounterShard, PostLike, PostView
+from app.services.post_counters import COUNTERS, reconcile_counters
+from app.services.view_history import empty_month, month_of
+
+
+def _add_views(db, post, day: date, views: int, unique_views: int) -> None:
+    daily_views, daily_unique_views = empty_month(), empty_month()
+    daily_views[day.day - 1] = views
+    daily_unique_views[day.day - 1] = unique_views
+    db.add(PostView(
+        post_id=post.id, month=month_of(day),
+        daily_views=daily_views, daily_unique_views=daily_unique_views
+    ))
+
+
+def _drifted(db, **kwargs):
+    return {row.post_id: row for rows in reconcile_counters(db, **kwargs) for row in rows}
+
+
+def test_dry_run_reports_drift_without_writing(db, make_user, make_post):
+    author, reader = make_user(), make_user()
+    drifted_post = make_post(author, likes_count=5, comments_count=0, view_count=3, unique_views=1)
+    correct_post = make_post(author, likes_count=1, comments_count=1, view_count=4, unique_views=2)
+
+    db.add_all([
+        PostLike(user_id=reader.id, post_id=drifted_post.id),
+        PostLike(user_id=author.id, post_id=drifted_post.id),
+        Comment(user_id=reader.id, post_id=drifted_post.id, content="hi"),
+        Comment(user_id=reader.id, post_id=drifted_post.id, content="gone", is_deleted=True),
+        PostLike(user_id=reader.id, post_id=correct_post.id),
+        Comment(user_id=reader.id, post_id=correct_post.id, content="hi"),
+    ])
+    _add_views(db, drifted_post, date(2026, 2, 28), views=7, unique_views=5)
+    _add_views(db, correct_post, date(2026, 3, 1), views=4, unique_views=2)
+    db.flush()
+
+    drifted = _drifted(db, dry_run=True, chunk_size=1)
+
+    assert set(drifted) == {drifted_post.id}
+    row = drifted[drifted_post.id]
+    assert (row.stored_likes_count, row.expected_likes_count) == (5, 2)
+    assert (row.stored_comments_count, row.expected_comments_count) == (0, 1)
+    assert (row.stored_view_count, row.expected_view_count) == (3, 7)
+    assert (row.stored_unique_views, row.expected_unique_views) == (1, 5)
+
+    db.expire_all()
+    assert [getattr(db.get(BlogPost, drifted_post.id), name) for name in COUNTERS] == [5, 0, 3, 1]
+
+
+def test_dry_run_of_some_counters_only_reads_their_sources(db, make_user, make_post, query_counter):
+    author = make_user()
+    post = make_post(author, likes_count=2, comments_count=9, view_count=9, unique_views=9)
+    db.add(PostLike(user_id=author.id, post_id=post.id))
+    db.flush()
+
+    query_counter.reset()
+    drifted = _drifted(db, counters=("likes_count",), dry_run=True)
+
+    row = drifted[post.id]
+    assert (row.stored_likes_count, row.expected_likes_count) == (2, 1)
+    assert "expected_comments_count" not in row._fields
+    statements = "\n".join(query_counter.statements)
+    assert "post_likes" in statements
+    assert "comments" not in statements
+    assert "post_views" not in statements
+
+
+def test_unfolded_shards_are_not_drift(db, make_user, make_post):
+    author, reader = make_user(), make_user()
+    post = make_post(author, likes_count=0, comments_count=0, view_count=0, unique_views=0, counters_sharded=True)
+    db.add_all([
+        PostLike(user_id=reader.id, post_id=post.id),
+        PostLike(user_id=author.id, post_id=post.id),
+        PostCounterShard(post_id=post.id, shard=0, likes_count=1, writes=1),
+        PostCounterShard(post_id=post.id, shard=3, likes_count=1, writes=1),
+    ])
+    db.flush()
+
+    assert post.id not in _drifted(db, counters=("likes_count",), dry_run=True)
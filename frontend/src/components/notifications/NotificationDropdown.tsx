@@ -8,6 +8,7 @@ import {
   MessageCircle,
   UserPlus,
   Reply,
+  FileText,
   X,
   Check,
   Loader2,
@@ -86,12 +87,21 @@ export default function NotificationDropdown({ isAuthenticated }: NotificationDr
     }
   }, [isAuthenticated]);
 
-  // Initial fetch and polling
+  // Initial fetch, then refetch whenever the server pushes a notification
   useEffect(() => {
     if (isAuthenticated) {
       fetchUnreadCount();
-      const interval = setInterval(fetchUnreadCount, 10000); // Poll every 10 seconds for near real-time
-      return () => clearInterval(interval);
+
+      const token = localStorage.getItem('access_token');
+      if (!token || typeof EventSource === 'undefined') {
+        const interval = setInterval(fetchUnreadCount, 10000); // Fall back to polling
+        return () => clearInterval(interval);
+      }
+
+      // EventSource reconnects on its own and resumes with Last-Event-ID
+      const source = new EventSource(notificationAPI.getStreamUrl(token));
+      source.addEventListener('notification', fetchUnreadCount);
+      return () => source.close();
     }
   }, [isAuthenticated, fetchUnreadCount]);
 
@@ -215,13 +225,17 @@ export default function NotificationDropdown({ isAuthenticated }: NotificationDr
         return <UserPlus className="w-4 h-4 text-green-500" />;
       case 'reply':
         return <Reply className="w-4 h-4 text-purple-500" />;
+      case 'new_post':
+        return <FileText className="w-4 h-4 text-indigo-500" />;
       default:
         return <Bell className="w-4 h-4 text-gray-500" />;
     }
   };
 
   const getNotificationMessage = (notification: Notification) => {
-    const actor = notification.actor.github_username || notification.actor.username;
+    const name = notification.actor.github_username || notification.actor.username;
+    const others = (notification.actor_count || 1) - 1;
+    const actor = others > 0 ? `${name} and ${others} other${others > 1 ? 's' : ''}` : name;
     switch (notification.type) {
       case 'like':
         return (
@@ -253,6 +267,15 @@ export default function NotificationDropdown({ isAuthenticated }: NotificationDr
             <strong>{actor}</strong> replied to your comment
           </>
         );
+      case 'new_post':
+        return (
+          <>
+            <strong>{actor}</strong> published a new post
+            {notification.post && (
+              <span className="text-gray-500"> "{notification.post.title}"</span>
+            )}
+          </>
+        );
       default:
         return 'New notification';
     }
@@ -156,8 +156,10 @@ export const mypageAPI = {
   getFollowing: (params?: { page?: number; limit?: number }) =>
     api.get('/mypage/me/following', { params }),
   getStats: () => api.get('/mypage/me/stats'),
-  getStatsHistory: (days?: number) =>
-    api.get('/mypage/me/stats/history', { params: { days } }),
+  getStatsHistory: (days?: number, analytics?: boolean) =>
+    api.get('/mypage/me/stats/history', { params: { days, analytics } }),
+  getPostStatsHistory: (postId: string, days?: number) =>
+    api.get(`/mypage/me/posts/${postId}/stats/history`, { params: { days } }),
 };
 
 // Public Feed API
@@ -219,6 +221,9 @@ export const notificationAPI = {
     api.post('/notifications/mark-read', { notification_ids: notificationIds }),
   deleteNotification: (notificationId: string) =>
     api.delete(`/notifications/${notificationId}`),
+  // EventSource cannot send headers, so the token goes in the query string
+  getStreamUrl: (token: string) =>
+    `${API_URL}/api/v1/notifications/stream?access_token=${encodeURIComponent(token)}`,
 };
 
 // Workflow API
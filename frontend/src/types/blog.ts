@@ -184,11 +184,34 @@ export interface DailyStats {
   comments: number;
 }
 
+export interface MetricAnalytics {
+  total: number;
+  previous_total: number;
+  growth: number | null;
+  ma7: number[];
+  ma28: number[];
+}
+
+export interface PostPercentile {
+  post_id: string;
+  title: string;
+  views: number;
+  likes: number;
+  views_percentile: number;
+  likes_percentile: number;
+}
+
+export interface StatsAnalytics {
+  metrics: Record<string, MetricAnalytics>;
+  posts: PostPercentile[];
+}
+
 export interface StatsHistory {
   daily_stats: DailyStats[];
   total_views: number;
   total_likes: number;
   total_comments: number;
+  analytics?: StatsAnalytics | null;
 }
 
 // Notification types
@@ -215,8 +238,10 @@ export interface NotificationComment {
 
 export interface Notification {
   id: string;
-  type: 'like' | 'comment' | 'follow' | 'reply';
-  actor: NotificationActor;
+  type: 'like' | 'comment' | 'follow' | 'reply' | 'new_post';
+  actor: NotificationActor; // Most recent actor
+  actor_count: number; // Actors grouped into this notification
+  sample_actor_ids: string[];
   post: NotificationPost | null;
   comment: NotificationComment | null;
   is_read: boolean;